@@ -46,9 +46,9 @@ m.node_tree.links.new(m_em.outputs['Emission'], m_out.inputs['Surface'])
 
 s().data.materials.append(m)
 
-for this_frame, pulse_val in enumerate(pulse_vec):
-    s.scl = [pulse_val, 1, pulse_val]
-    s.key(this_frame+1)
+n_frames = len(pulse_vec)
+s.key_bulk(np.arange(n_frames)+1, [np.tile(s().location, (n_frames, 1)), np.tile(s().rotation_euler, (n_frames, 1)), np.c_[pulse_vec, np.ones_like(pulse_vec), pulse_vec]], 'lrs')
+s.scl = [pulse_vec[-1], 1, pulse_vec[-1]]
 
 cr = new.CircularRig()
 cr.scale(1.2)
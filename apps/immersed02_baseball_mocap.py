@@ -25,25 +25,24 @@ traj_frame_post = np.round(traj_win_post*data_rate)
 anim_frame = env.Key().start
 data_time = anim_start
 
-p = Pencil(name="Trajectory_pred")
-p.layer = "Ref_RWristLat"
+p = mantle.Trail("Trajectory_pred", data, traj_win_pre, traj_win_post, data_rate, anim_rate, anim_start, layer_name="Ref_RWristLat")
 
-ts = {}
-for sph_name in pos.keys():
-    ts[sph_name] = new.sphere(name=sph_name, r=0.3)
-    ts[sph_name].shade("smooth")
+marker_names = list(pos.keys())
 
-stroke_list = list()
+anim_frames = []
+data_center_frames = []
 while data_time <= anim_end:
     data_center_frame = int(np.round(data_time*data_rate))
-    p.keyframe = anim_frame
-    stroke_list.append(p.stroke(cf.PointCloud(data[int(data_center_frame-traj_frame_pre):int(data_center_frame+traj_frame_post), :])))
-    for sph_name in ts:
-        ts[sph_name].loc = pos[sph_name][data_center_frame, :]
-        ts[sph_name].key(anim_frame, 'l')
+    anim_frames.append(anim_frame)
+    data_center_frames.append(data_center_frame)
     anim_frame = anim_frame + 1
     data_time = data_time + 1/anim_rate
 
+marker_pos = np.stack([pos[sph_name][data_center_frames, :] for sph_name in marker_names], axis=1) # nFrames x nMarkers x 3
+ts = new.instances(marker_pos[0], proto='sphere', r=0.3, name='markers')
+ts.proto.shade("smooth")
+ts.animate(anim_frames, marker_pos)
+
 # plot a mesh for an overview of the 'entire' animated trajectory
 data_msh = data[int(np.round(anim_start*data_rate)-traj_frame_pre):int(np.round(anim_end*data_rate)+traj_frame_post)]
 traj_msh = new.mesh(name="Trajectory_path", x=data_msh[:,0], y=data_msh[:,1], z=data_msh[:,2])
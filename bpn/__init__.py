@@ -1,3 +1,7 @@
 """
 Praneeth's blender python package.
 """
+try:
+    from bpn.env import batch
+except ImportError: # outside blender, e.g. in worker processes that only need bpn.vef
+    pass
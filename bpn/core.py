@@ -12,19 +12,20 @@ import functools
 import json
 import math
 import os
-import copy
+import random
 
 import numpy as np
+from scipy import sparse
 import blinker
+import matplotlib.colors as mc
 from matplotlib.pyplot import rcParams
 COLOR_LIST = rcParams['axes.prop_cycle'].by_key()['color']
 
 import bpy #pylint: disable=import-error
 import bmesh #pylint: disable=import-error
 import mathutils #pylint: disable=import-error
-from io_mesh_stl.stl_utils import write_stl #pylint: disable=import-error
 
-from bpn import new, utils, handlers
+from bpn import new, utils, handlers, env, vef
 
 class _ThingDB(dict):
     """
@@ -34,13 +35,24 @@ class _ThingDB(dict):
     a is utils.get('emp') # True if this is working.
 
     Something similar will be useful to keep track of handlers and relationships between objects.
+
+    Things are stored per class, keyed by their name in blender. The
+    database keeps the wrappers alive, so their state (e.g. the undo
+    history of a Mesh, or the keyframe index of a GreasePencil) is kept
+    when the wrapper is retrieved again. Entries are removed when the
+    thing is removed through bpn (-thing), when retrieval finds that it
+    is no longer in blender, or with clean.
     """
     def clean(self):
         """Remove objects not in blender's environment."""
-        for coll in self.values():
-            for thing in coll:
-                if not self.thing_in_blend(thing):
-                    self.remove(thing) # remove from database
+        blend_names = {} # names in each blender collection, read once
+        for cls_things in self.values():
+            for thing_name, thing in list(cls_things.items()):
+                coll_name = utils.bpy_coll_name(thing.blend_type)
+                if coll_name not in blend_names:
+                    blend_names[coll_name] = set(getattr(bpy.data, coll_name).keys())
+                if thing_name not in blend_names[coll_name]:
+                    del cls_things[thing_name] # remove from database
     def thing_in_blend(self, thing):
         """Return True if thing is in blender's environment."""
         try:
@@ -50,20 +62,26 @@ class _ThingDB(dict):
             return False
     def remove(self, thing):
         """Remove an object from database"""
-        self[thing.__class__.__name__] = [t for t in self[thing.__class__.__name__] if t.name != thing.name]
-    def add(self, thing):
+        cls_things = self.get(thing.__class__.__name__, {})
+        if cls_things.get(thing.name) is thing:
+            del cls_things[thing.name]
+    def add(self, thing, thing_name):
         """
         Add a thing to the database. DOES NOT CHECK IF IT ALREADY EXISTS.
         The parent class of this module 'Thing' tries to retrieve an object, 
         and summons this add functionality if the retrieval fails.
         """
-        self[thing.__class__.__name__].append(thing)
+        self.setdefault(thing.__class__.__name__, {})[thing_name] = thing
+    def rename(self, thing, old_name, new_name):
+        """Update the database when a thing is renamed."""
+        cls_things = self.setdefault(thing.__class__.__name__, {})
+        if cls_things.get(old_name) is thing:
+            del cls_things[old_name]
+        cls_things[new_name] = thing
     def retrieve(self, thing_name, cls_name):
         """If thing_name of class cls_name is in the database, return it. Else return None"""
-        this_class_objs = self.setdefault(cls_name, [])
-        this_class_dict = {t.name: t for t in this_class_objs}
-        if thing_name in this_class_dict:
-            thing = this_class_dict[thing_name]
+        thing = self.setdefault(cls_name, {}).get(thing_name)
+        if thing is not None:
             if self.thing_in_blend(thing):
                 # a retrieved object must exist in blender's environment (if not, create a new one)
                 return thing
@@ -95,6 +113,21 @@ class _HandlerDB(blinker.base.Namespace):
 HandlerDB = _HandlerDB()
 
 
+# Blender can re-allocate ID data on undo, redo and file load.
+# References cached by Thing.__call__ are discarded when this counter changes.
+_id_generation = 0
+
+@bpy.app.handlers.persistent
+def _invalidate_id_refs(*args): #pylint: disable=unused-argument
+    global _id_generation #pylint: disable=global-statement
+    _id_generation += 1
+
+for _hdl_list in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+    for _hdl in [h for h in _hdl_list if getattr(h, '__name__', '') == '_invalidate_id_refs']:
+        _hdl_list.remove(_hdl) # in case the module is reloaded
+    _hdl_list.append(_invalidate_id_refs)
+
+
 class Thing:
     """
     Wrapper around blender's bpy.data.*
@@ -108,9 +141,9 @@ class Thing:
             thing_name = thing_name.name
         # retrieve instance if it exists
         this_instance = ThingDB.retrieve(thing_name, cls.__name__)
-        if not this_instance:
+        if this_instance is None:
             this_instance = super().__new__(cls) # make a new instance
-            ThingDB.add(this_instance) # add it to the database
+            ThingDB.add(this_instance, thing_name) # add it to the database
             return this_instance # send it for initialization
         # Create a new instance if it doesn't exist
         return this_instance
@@ -127,9 +160,10 @@ class Thing:
     
         self.blend_name = thing_name
         self.blend_type = thing_type # bpy.types.Object
+        self._blend_coll_name = utils.bpy_coll_name(thing_type) # objects
 
         # if it is not in the blend_coll, create a new one
-        if thing_name not in [t.name for t in self.blend_coll]:
+        if self.blend_coll.get(thing_name) is None:
             self.blend_coll.new(thing_name, *args)
         
         for key, val in kwargs.items():
@@ -138,11 +172,20 @@ class Thing:
     @property
     def blend_coll(self): # bpy.data.objects, bpy.data.meshes
         """Get the blender collection on demand."""
-        return getattr(bpy.data, utils.bpy_coll_name(self.blend_type))
+        return getattr(bpy.data, self._blend_coll_name)
 
     def __call__(self):
         """Return the blender object."""
-        return self.blend_coll[self.blend_name]
+        ref = self.__dict__.get('_blend_ref')
+        if ref is not None and self._blend_ref_gen == _id_generation:
+            try:
+                if ref.name == self.blend_name:
+                    return ref
+            except ReferenceError: # removed from blender
+                pass
+        ref = self.blend_coll[self.blend_name]
+        self._blend_ref, self._blend_ref_gen = ref, _id_generation
+        return ref
     
     def __neg__(self):
         """Remove that object."""
@@ -168,8 +211,10 @@ class Thing:
     @name.setter
     def name(self, new_name):
         if new_name != self().name:
-            new_name_checked = utils.new_name(new_name, [t.name for t in self.blend_coll]) # in case you rename it to something that is already present
+            new_name_checked = utils.new_name(new_name, coll=self._blend_coll_name) # in case you rename it to something that is already present
             self().name = new_name_checked
+            ThingDB.rename(self, self.blend_name, new_name_checked)
+            env.PROP_INDEX.invalidate()
             self.blend_name = new_name_checked
             if new_name_checked != new_name:
                 print(new_name+' already present. Used '+new_name_checked)
@@ -249,8 +294,81 @@ class Collection(Thing):
     @property
     def in_scene(self):
         """Is the collection in the current scene?"""
-        return self.name in [c.name for c in bpy.context.scene.collection.children[:]]
-    # Group transformations for objects in a collection!
+        return bpy.context.scene.collection.children.get(self.name) is not None
+
+    @property
+    def objects_array(self):
+        """Objects in this collection as an ObjectArray, for group transformations."""
+        return ObjectArray(self().objects)
+
+
+def keyframe_insert_bulk(target, data_path, frames, values, interpolation=None, group=None):
+    """
+    Insert keyframes at many frames in one go by filling F-curves directly.
+    Same result as setting the property and calling keyframe_insert at
+    each frame, but without the per-frame overhead.
+    Keys at frames that are already keyed are overwritten.
+
+    :param target: blender struct owning the property, e.g. bpy.types.Object, or a constraint
+    :param data_path: (str) property name, e.g. 'location', 'rotation_euler', 'scale', 'lens'
+    :param frames: (array) nFrames
+    :param values: (array) nFrames for single-valued properties, nFrames x array length otherwise
+    :param interpolation: (str) 'CONSTANT', 'LINEAR', 'BEZIER', ... (default: blender preference for new keyframes)
+    :param group: (str) action group for new F-curves (default: 'Object Transforms' for object transforms)
+    Returns a list of F-curves that were written.
+    Example:
+        core.keyframe_insert_bulk(s(), 'location', np.arange(1, 101), np.random.rand(100, 3))
+    """
+    id_data = target.id_data
+    full_path = data_path if target == id_data else target.path_from_id(data_path)
+    frames = np.asarray(frames, dtype=np.float32).ravel()
+    values = np.asarray(values, dtype=np.float32).reshape(len(frames), -1)
+    if interpolation is None:
+        interpolation = bpy.context.preferences.edit.keyframe_new_interpolation_type
+    if group is None and isinstance(id_data, bpy.types.Object) and data_path in ('location', 'rotation_euler', 'rotation_quaternion', 'scale'):
+        group = 'Object Transforms'
+
+    if id_data.animation_data is None:
+        id_data.animation_data_create()
+    if id_data.animation_data.action is None:
+        id_data.animation_data.action = bpy.data.actions.new(id_data.name + 'Action')
+    action = id_data.animation_data.action
+
+    fcurves = []
+    for index in range(values.shape[1]):
+        if hasattr(action, 'fcurve_ensure_for_datablock'): # layered actions (blender 4.4+)
+            fc = action.fcurve_ensure_for_datablock(id_data, full_path, index=index, group_name=group or '')
+        else:
+            fc = action.fcurves.find(full_path, index=index)
+            if fc is None:
+                fc = action.fcurves.new(full_path, index=index, action_group=group or '')
+        kp = fc.keyframe_points
+        co = np.c_[frames, values[:, index]]
+
+        # overwrite keys at existing frames, and add the rest at the end
+        n_old = len(kp)
+        co_all = _foreach_get(kp, 'co', 2)
+        overlap = np.isin(co_all[:, 0], frames)
+        if np.any(overlap):
+            frame_to_row = {f: i for i, f in enumerate(frames)}
+            co_all[overlap, 1] = co[[frame_to_row[f] for f in co_all[overlap, 0]], 1]
+            co = co[~np.isin(frames, co_all[overlap, 0])]
+        kp.add(len(co))
+        co_all = np.r_[co_all, co].astype(np.float32)
+        kp.foreach_set('co', co_all.reshape(-1))
+
+        # interpolation of the keys that were written
+        written = np.r_[np.flatnonzero(overlap), np.arange(n_old, len(kp))]
+        try:
+            interp = _foreach_get(kp, 'interpolation', dtype=np.int32)
+            interp[written] = bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items[interpolation].value
+            kp.foreach_set('interpolation', interp)
+        except TypeError: # enum properties not supported by foreach_get/foreach_set
+            for i in written:
+                kp[i].interpolation = interpolation
+        fc.update() # sort keys and re-calculate handles
+        fcurves.append(fc)
+    return fcurves
 
 
 class Object(Thing):
@@ -262,6 +380,9 @@ class Object(Thing):
 
     DOES NOT put it in a collection. That is the job of functions in the new module.
     """
+    ALL_CONSTRAINTS = tuple(cn.lower() for cn in ('CAMERA_SOLVER', 'FOLLOW_TRACK', 'OBJECT_SOLVER', 'COPY_LOCATION', 'COPY_ROTATION', 'COPY_SCALE', 'COPY_TRANSFORMS', 'LIMIT_DISTANCE', 'LIMIT_LOCATION', 'LIMIT_ROTATION', 'LIMIT_SCALE', 'MAINTAIN_VOLUME', 'TRANSFORM', 'TRANSFORM_CACHE', 'CLAMP_TO', 'DAMPED_TRACK', 'IK', 'LOCKED_TRACK', 'SPLINE_IK', 'STRETCH_TO', 'TRACK_TO', 'ACTION', 'ARMATURE', 'CHILD_OF', 'FLOOR', 'FOLLOW_PATH', 'PIVOT', 'SHRINKWRAP'))
+    ALL_MODIFIERS = tuple(mod.lower() for mod in ('DATA_TRANSFER', 'MESH_CACHE', 'MESH_SEQUENCE_CACHE', 'NORMAL_EDIT', 'WEIGHTED_NORMAL', 'UV_PROJECT', 'UV_WARP', 'VERTEX_WEIGHT_EDIT', 'VERTEX_WEIGHT_MIX', 'VERTEX_WEIGHT_PROXIMITY', 'ARRAY', 'BEVEL', 'BOOLEAN', 'BUILD', 'DECIMATE', 'EDGE_SPLIT', 'MASK', 'MIRROR', 'MULTIRES', 'REMESH', 'SCREW', 'SKIN', 'SOLIDIFY', 'SUBSURF', 'TRIANGULATE', 'WELD', 'WIREFRAME', 'ARMATURE', 'CAST', 'CURVE', 'DISPLACE', 'HOOK', 'LAPLACIANDEFORM', 'LATTICE', 'MESH_DEFORM', 'SHRINKWRAP', 'SIMPLE_DEFORM', 'SMOOTH', 'CORRECTIVE_SMOOTH', 'LAPLACIANSMOOTH', 'SURFACE_DEFORM', 'WARP', 'WAVE', 'CLOTH', 'COLLISION', 'DYNAMIC_PAINT', 'EXPLODE', 'FLUID', 'OCEAN', 'PARTICLE_INSTANCE', 'PARTICLE_SYSTEM', 'SOFT_BODY', 'SURFACE'))
+
     def __new__(cls, name, *args, **kwargs):
         return super().__new__(cls, name, *args, **kwargs)
 
@@ -270,21 +391,45 @@ class Object(Thing):
         # don't over-write internal states if object was retrieved from database
         if not hasattr(self, 'frame_gp'):
             self.frame_gp = None # grease pencil object that displays the frame
-        if not hasattr(self, 'frame_orig'):
-            self.frame_orig = self.frame
+        if not hasattr(self, '_frame_orig'):
+            self._frame_orig = np.array(self().matrix_world)
 
-        # internal states determined by blender: re-initialize even if object is retrieved from the database
-        self.container = self().parent.name if self().parent else None
+        # internal states determined by blender: re-built on first use, even if object is retrieved from the database
+        self._constraint_list = None
+        self._modifier_list = None
 
-        all_constraints = ('CAMERA_SOLVER', 'FOLLOW_TRACK', 'OBJECT_SOLVER', 'COPY_LOCATION', 'COPY_ROTATION', 'COPY_SCALE', 'COPY_TRANSFORMS', 'LIMIT_DISTANCE', 'LIMIT_LOCATION', 'LIMIT_ROTATION', 'LIMIT_SCALE', 'MAINTAIN_VOLUME', 'TRANSFORM', 'TRANSFORM_CACHE', 'CLAMP_TO', 'DAMPED_TRACK', 'IK', 'LOCKED_TRACK', 'SPLINE_IK', 'STRETCH_TO', 'TRACK_TO', 'ACTION', 'ARMATURE', 'CHILD_OF', 'FLOOR', 'FOLLOW_PATH', 'PIVOT', 'SHRINKWRAP')
-        self.constraint_list = {cn.lower() : None for cn in all_constraints}
-        for con in self().constraints[:]: # if they are already there, then add them to the name list
-            self.constraint_list[con.type.lower()] = con.name
-        
-        all_modifiers = ('DATA_TRANSFER', 'MESH_CACHE', 'MESH_SEQUENCE_CACHE', 'NORMAL_EDIT', 'WEIGHTED_NORMAL', 'UV_PROJECT', 'UV_WARP', 'VERTEX_WEIGHT_EDIT', 'VERTEX_WEIGHT_MIX', 'VERTEX_WEIGHT_PROXIMITY', 'ARRAY', 'BEVEL', 'BOOLEAN', 'BUILD', 'DECIMATE', 'EDGE_SPLIT', 'MASK', 'MIRROR', 'MULTIRES', 'REMESH', 'SCREW', 'SKIN', 'SOLIDIFY', 'SUBSURF', 'TRIANGULATE', 'WELD', 'WIREFRAME', 'ARMATURE', 'CAST', 'CURVE', 'DISPLACE', 'HOOK', 'LAPLACIANDEFORM', 'LATTICE', 'MESH_DEFORM', 'SHRINKWRAP', 'SIMPLE_DEFORM', 'SMOOTH', 'CORRECTIVE_SMOOTH', 'LAPLACIANSMOOTH', 'SURFACE_DEFORM', 'WARP', 'WAVE', 'CLOTH', 'COLLISION', 'DYNAMIC_PAINT', 'EXPLODE', 'FLUID', 'OCEAN', 'PARTICLE_INSTANCE', 'PARTICLE_SYSTEM', 'SOFT_BODY', 'SURFACE')
-        self.modifier_list = {mod.lower() : None for mod in all_modifiers}
-        for mod in self().modifiers[:]: # if they are already there, then add them to the modifier list
-            self.modifier_list[mod.type.lower()] = mod.name
+    @property
+    def container(self):
+        """Name of the parent object, unless a container is assigned explicitly."""
+        if getattr(self, '_container', None) is not None:
+            return self._container
+        return self().parent.name if self().parent else None
+    @container.setter
+    def container(self, new_container):
+        self._container = new_container
+
+    @property
+    def frame_orig(self):
+        """Object frame when the wrapper was first created."""
+        return cf.CoordFrame(self._frame_orig, unit_vectors=False)
+
+    @property
+    def constraint_list(self):
+        """Lowercase constraint type -> name of the constraint of that type on this object (or None)."""
+        if self._constraint_list is None:
+            self._constraint_list = dict.fromkeys(self.ALL_CONSTRAINTS)
+            for con in self().constraints: # if they are already there, then add them to the name list
+                self._constraint_list[con.type.lower()] = con.name
+        return self._constraint_list
+
+    @property
+    def modifier_list(self):
+        """Lowercase modifier type -> name of the modifier of that type on this object (or None)."""
+        if self._modifier_list is None:
+            self._modifier_list = dict.fromkeys(self.ALL_MODIFIERS)
+            for mod in self().modifiers: # if they are already there, then add them to the modifier list
+                self._modifier_list[mod.type.lower()] = mod.name
+        return self._modifier_list
 
     @property
     def frame(self):
@@ -295,11 +440,11 @@ class Object(Thing):
     def frame(self, new_frame):
         m = new_frame.m if isinstance(new_frame, cf.CoordFrame) else new_frame
         self().matrix_world = mathutils.Matrix(m)
-        bpy.context.view_layer.update()
+        env.update()
 
     def frame_reset(self):
         """Reset matrix_world to what it was when created."""
-        self.frame = self.frame_orig
+        self.frame = self._frame_orig
 
     @property
     def normal(self):
@@ -319,7 +464,7 @@ class Object(Thing):
         n2 = cf.norm_vec(new_normal)
         q = cf.Quat(np.cross(n1, n2), np.arccos(np.dot(n1, n2)), cf.CoordFrame(origin=self.frame.origin))
         self.frame = q*self.frame # quaternion direction specified in world frame, origin at origin of the object
-        bpy.context.view_layer.update()
+        env.update()
 
     def show_frame(self, name=None, **kwargs):
         """
@@ -346,10 +491,9 @@ class Object(Thing):
         if self.frame_gp is None:
             self.frame_gp = new.pencil(name, **{**names, **kwargs})
         for cnt in (0, 1, 2):
-            this_stroke_name = self.frame_gp.data.layer.info+'_key{:04d}'.format(self.frame_gp.data.keyframe.frame_number)+'_stroke{:03d}'.format(cnt)
-            this_stroke = [stroke for key_name, stroke in self.frame_gp.strokes.items() if key_name == this_stroke_name]
-            if this_stroke:
-                this_stroke[0].points.foreach_set('co', pcf.co[[0, cnt+1]].flatten())
+            this_stroke = self.frame_gp.data.get_stroke(cnt)
+            if this_stroke is not None:
+                this_stroke.points.foreach_set('co', pcf.co[[0, cnt+1]].flatten())
             else:
                 self.frame_gp.stroke(cf.PointCloud(pcf.co[[0, cnt+1]], np.eye(4)), color='crd_'+('i', 'j', 'k')[cnt], line_width=kwargs['line_width']*kwargs['scale'])
         self.frame_gp().update_tag()
@@ -364,7 +508,7 @@ class Object(Thing):
     def loc(self, new_loc):
         assert np.size(new_loc) == 3
         self().location = mathutils.Vector(new_loc)
-        bpy.context.view_layer.update()
+        env.update()
 
     @property
     def rot(self):
@@ -375,7 +519,7 @@ class Object(Thing):
         self().rotation_euler.x = theta[0]
         self().rotation_euler.y = theta[1]
         self().rotation_euler.z = theta[2]
-        bpy.context.view_layer.update()
+        env.update()
 
     @property
     def scl(self):
@@ -388,10 +532,10 @@ class Object(Thing):
         else:
             assert np.size(s) == 3
             self().scale = mathutils.Vector(s)
-        bpy.context.view_layer.update()
+        env.update()
 
         self().scale = mathutils.Vector(s)
-        bpy.context.view_layer.update()
+        env.update()
 
     # object transforms - update view_layer after any transform operating on the object (bo)
     def translate(self, delta=0, x=0, y=0, z=0):
@@ -407,7 +551,7 @@ class Object(Thing):
             delta = (x, y, z)
         assert len(delta) == 3
         self().location = self().location + mathutils.Vector(delta)
-        bpy.context.view_layer.update()
+        env.update()
         return self
     
     def rotate(self, theta, inp_type='degrees', frame='global'):
@@ -426,7 +570,7 @@ class Object(Thing):
             self().rotation_euler.z = self().rotation_euler.z + theta[2]
         else: #frame = global
             self().rotation_euler.rotate(mathutils.Euler(tuple(theta)))
-        bpy.context.view_layer.update()
+        env.update()
         return self
 
     def scale(self, delta):
@@ -439,7 +583,7 @@ class Object(Thing):
         else:
             assert np.size(delta) == 3
             self().scale = mathutils.Vector(np.array(delta)*np.array(self().scale))
-        bpy.context.view_layer.update()
+        env.update()
         return self
 
     # animation
@@ -478,6 +622,44 @@ class Object(Thing):
             s.scl = (1, 0.2, 1)
             s.key(51)
         """
+        attrs = self._key_attrs(target)
+
+        if not frame:
+            frame = bpy.context.scene.frame_current
+
+        if values is None:
+            for attr in attrs:
+                self().keyframe_insert(data_path=attr, frame=frame)
+            return self
+        
+        for attr, value in zip(attrs, values):
+            setattr(self(), attr, value)
+            self().keyframe_insert(data_path=attr, frame=frame)
+
+        return self # so you can chain keyings into one command
+
+    def key_bulk(self, frames, values, target='l', interpolation=None):
+        """
+        Key many frames at once, e.g. from motion capture data.
+        Much faster than setting loc/rot/scl and calling key in a loop.
+        :param frames: (array) nFrames
+        :param values: (array) nFrames x 3, or a list of nFrames x 3 arrays when target has multiple attributes (e.g. 'lrs')
+        :param target: (str) same as key
+        :param interpolation: (str) 'CONSTANT', 'LINEAR', 'BEZIER', ... See keyframe_insert_bulk
+        Example:
+            s.key_bulk(np.arange(1, 101), np.random.rand(100, 3), 'l')
+        """
+        attrs = self._key_attrs(target)
+        if len(attrs) == 1:
+            values = [values]
+        assert len(values) == len(attrs)
+        for attr, value in zip(attrs, values):
+            keyframe_insert_bulk(self(), attr, frames, value, interpolation)
+        return self
+
+    @staticmethod
+    def _key_attrs(target):
+        """Attributes to key for a target string, e.g. 'lr' -> ['location', 'rotation_euler']"""
         assert isinstance(target, str)
         target = target.lower()
 
@@ -492,23 +674,10 @@ class Object(Thing):
         if target in ['lr', 'locrot']:
             attrs = ['location', 'rotation_euler']
         if target in ['ls', 'locscl', 'locscale']:
-            attrs = ['location', 'rotation_euler']
+            attrs = ['location', 'scale']
         if target in ['rs', 'rotscl', 'rotscale']:
             attrs = ['rotation_euler', 'scale']
-
-        if not frame:
-            frame = bpy.context.scene.frame_current
-
-        if values is None:
-            for attr in attrs:
-                self().keyframe_insert(data_path=attr, frame=frame)
-            return self
-        
-        for attr, value in zip(attrs, values):
-            setattr(self(), attr, value)
-            self().keyframe_insert(data_path=attr, frame=frame)
-
-        return self # so you can chain keyings into one command
+        return attrs
     
     @property
     def coll(self):
@@ -536,7 +705,7 @@ class Object(Thing):
         oldC = self.coll
         if not isinstance(coll_name, str):
             coll_name = coll_name.name
-        if coll_name not in [c.name for c in bpy.data.collections]:
+        if bpy.data.collections.get(coll_name) is None:
             # creates a new collection and links it to the current scene if it doesn't exist
             newC = Collection(coll_name)()
         else:
@@ -659,41 +828,381 @@ class Object(Thing):
         """
         this_o = self.copy(obj_name=obj_name, coll_name=coll_name)
         this_o().data = this_o().data.copy()
+        this_o().data.pop(Mesh.primitive_tag, None) # the copy is not shared by new.easycreate
         if isinstance(msh_name, str):
             this_o.data.name = msh_name
         return utils.enhance(this_o())
 
 
+class ObjectArray:
+    """
+    Transform many objects together (e.g. markers, bones).
+
+    World matrices of all objects are handled as one (N, 4, 4) array,
+    and written back with a single view layer update.
+    Holds references to blender objects, so don't keep it around across
+    operations that delete objects.
+
+    Construction:
+        :param objs: list of core.Object, bpy.types.Object or object names, or a collection's objects
+    
+    Example:
+        oa = get('zoo').objects_array
+        oa.translate((0, 0, 1))
+        oa.rotate(rotmat, pivot=(0, 0, 0)) # rotate all objects about the world origin
+        oa.key_bulk(frames, pos, 'l') # pos is nFrames x N x 3
+    """
+    def __init__(self, objs):
+        self._seq = objs if isinstance(objs, bpy.types.bpy_prop_collection) else None
+        self.objs = [bpy.data.objects[o] if isinstance(o, str) else (o() if isinstance(o, Thing) else o) for o in objs]
+
+    def __len__(self):
+        return len(self.objs)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return ObjectArray(self.objs[key])
+        return utils.enhance(self.objs[key])
+
+    def __repr__(self):
+        return self.__module__+"."+self.__class__.__name__+"("+str(self.names)+")"
+
+    @property
+    def names(self):
+        """Names of objects."""
+        return [o.name for o in self.objs]
+
+    @property
+    def matrix_world(self):
+        """World matrices of all objects as an (N, 4, 4) numpy array."""
+        if self._seq is not None:
+            mw = _foreach_get(self._seq, 'matrix_world', 16).reshape(-1, 4, 4)
+            return mw.transpose(0, 2, 1).astype(np.float64) # blender stores matrices column-major
+        return np.array([o.matrix_world for o in self.objs]).reshape(-1, 4, 4)
+    @matrix_world.setter
+    def matrix_world(self, mw):
+        mw = np.asarray(mw)
+        assert mw.shape == (len(self), 4, 4)
+        # foreach_set doesn't trigger the updates that keep location, rotation and scale in sync
+        for o, m in zip(self.objs, mw):
+            o.matrix_world = mathutils.Matrix(m)
+        env.update()
+
+    @property
+    def loc(self):
+        """World locations of all objects as an (N, 3) numpy array."""
+        return self.matrix_world[:, :3, 3]
+    @loc.setter
+    def loc(self, new_loc):
+        mw = self.matrix_world
+        mw[:, :3, 3] = new_loc
+        self.matrix_world = mw
+
+    def transform(self, tfmat, pivot=None, local=False):
+        """
+        Apply a transformation to all objects.
+        :param tfmat: (4, 4) transformation matrix, or (N, 4, 4) for one transformation per object
+        :param pivot: (3,) or (N, 3) point about which the transformation is applied (default: world origin)
+        :param local: (bool) tfmat is specified in each object's own frame (pivot is ignored)
+        """
+        tfmat = np.asarray(tfmat, dtype=float)
+        mw = self.matrix_world
+        if local:
+            self.matrix_world = mw @ tfmat
+            return self
+        if pivot is not None:
+            to_pivot = np.broadcast_to(np.eye(4), (len(self), 4, 4)).copy()
+            to_pivot[:, :3, 3] = pivot
+            from_pivot = to_pivot.copy()
+            from_pivot[:, :3, 3] *= -1
+            tfmat = to_pivot @ tfmat @ from_pivot
+        self.matrix_world = tfmat @ mw
+        return self
+
+    def rotate(self, rotmat, pivot=None):
+        """
+        Rotate all objects.
+        :param rotmat: (3, 3) rotation matrix in world coordinates, or (N, 3, 3)
+        :param pivot: (3,) or (N, 3) center of rotation (default: origin of each object)
+        """
+        rotmat = np.asarray(rotmat, dtype=float)
+        tfmat = np.zeros(rotmat.shape[:-2] + (4, 4))
+        tfmat[..., :3, :3] = rotmat
+        tfmat[..., 3, 3] = 1
+        if pivot is None:
+            pivot = self.loc
+        return self.transform(tfmat, pivot)
+
+    def translate(self, delta):
+        """Translate all objects by (3,) or (N, 3) delta in world coordinates."""
+        self.loc = self.loc + np.asarray(delta)
+        return self
+
+    def key(self, frame=None, target='lrs'):
+        """Key the current state of all objects at frame. See Object.key"""
+        if not frame:
+            frame = bpy.context.scene.frame_current
+        attrs = Object._key_attrs(target) #pylint: disable=protected-access
+        for o in self.objs:
+            for attr in attrs:
+                o.keyframe_insert(data_path=attr, frame=frame)
+        return self
+
+    def key_bulk(self, frames, values, target='l', interpolation=None):
+        """
+        Key many frames for all objects at once.
+        :param frames: (array) nFrames
+        :param values: (array) nFrames x N x 3 (e.g. marker positions over time)
+        :param target: (str) a single attribute, one of 'l', 'r', 's'
+        """
+        attrs = Object._key_attrs(target) #pylint: disable=protected-access
+        assert len(attrs) == 1
+        values = np.asarray(values)
+        assert values.shape[:2] == (len(frames), len(self))
+        for i, o in enumerate(self.objs):
+            keyframe_insert_bulk(o, attrs[0], frames, values[:, i, :], interpolation)
+        return self
+
+
+def _foreach_get(seq, attr, width=1, dtype=np.float32):
+    """
+    Read attr from every element of a bpy_prop_collection into a new numpy array.
+    Blender copies straight into the buffer when dtype matches the
+    property (float32 for floats, int32 for ints, bool for booleans).
+    """
+    ret = np.empty(len(seq)*width, dtype=dtype)
+    seq.foreach_get(attr, ret)
+    if width > 1:
+        ret.shape = (-1, width)
+    return ret
+
+
 class Mesh(Thing):
-    """Wrapper around a bpy.types.Mesh object."""
+    """
+    Wrapper around a bpy.types.Mesh object.
+
+    Coordinate changes made through bpn are recorded for undo/redo.
+    Only the previous coordinates of the vertices that changed are
+    stored, and at most history_len changes are kept. Set history_len to 0 (on an instance, or on the
+    class) to turn history off, e.g. for batch jobs.
+
+    Meshes shared by new.easycreate (shared=True), new.spheres and
+    new.instances carry the custom property primitive_tag. Editing such
+    a mesh removes the tag. Edits made through a MeshObject copy a
+    tagged mesh first.
+    """
+    history_len = 2
+    primitive_tag = 'bpn_primitive'
+
     def __new__(cls, name, **kwargs): #pylint: disable=arguments-differ
         return super().__new__(cls, name, **kwargs)
 
     def __init__(self, name, **kwargs):
         super().__init__(name, 'Mesh', **kwargs)
         # Don't overwrite internal states if object was retrieved from database
-        if not hasattr(self, 'v_init'):
-            self.v_init = copy.deepcopy(self.v)
-        if not hasattr(self, 'v_bkp'):
-            self.v_bkp = copy.deepcopy(self.v)
-    
+        if not hasattr(self, '_cache'):
+            self._cache = {} # topology and geometry arrays, see _cached
+        if not hasattr(self, '_v_init'):
+            self._v_init = None # captured on the first change to coordinates
+        if not hasattr(self, '_undo'):
+            self._undo = [] # list of (vertex indices, coordinates before the change)
+            self._redo = []
+
+    @classmethod
+    def from_arrays(cls, name, v, f=None, e=None, attributes=None, calc_edges=None, f_csr=None):
+        """
+        Create a new mesh from numpy arrays (without from_pydata).
+        If a mesh with that name exists, blender will pick a new name.
+        :param v: (array) nVx3 vertex coordinates
+        :param f: faces - nFxk array, or a list (or tuple) of arrays with vertex indices of each face
+        :param e: (array) nEx2 vertex indices of edges
+        :param attributes: (dict) attribute name -> array, see set_attribute
+        :param calc_edges: (bool) let blender make the edges of faces (default: only when e is not given).
+            Without it, e must contain every edge of every face, and face corners are linked to e directly.
+        :param f_csr: faces as (loop_start, loop_total, vertex_indices), as returned by f_csr.
+            Use this instead of f, e.g. for meshes with mixed polygon sizes.
+        Example:
+            m = core.Mesh.from_arrays('tetra', v, [[0, 1, 2], [0, 1, 3], [1, 2, 3], [0, 2, 3]])
+            m = core.Mesh.from_arrays('grid', v, f, attributes={'height': v[:, 2], 'UVMap': uv})
+        """
+        ret = cls(bpy.data.meshes.new(name).name)
+        ret.fill(v, f, e, attributes, calc_edges, f_csr)
+        return ret
+
+    def fill(self, v, f=None, e=None, attributes=None, calc_edges=None, f_csr=None):
+        """
+        Add vertices, faces and edges to an empty mesh in bulk, using foreach_set.
+        See from_arrays.
+        """
+        msh = self()
+        assert len(msh.vertices) == 0
+        v = np.ascontiguousarray(v, dtype=np.float32).reshape(-1, 3)
+        msh.vertices.add(len(v))
+        msh.vertices.foreach_set('co', v.reshape(-1))
+
+        if e is not None and len(e) > 0:
+            e = np.ascontiguousarray(e, dtype=np.int32).reshape(-1, 2)
+            msh.edges.add(len(e))
+            msh.edges.foreach_set('vertices', e.reshape(-1))
+
+        assert f is None or f_csr is None
+        has_faces = (f is not None and len(f) > 0) or (f_csr is not None and len(f_csr[1]) > 0)
+        if has_faces:
+            if f_csr is not None:
+                _, loop_total, loop_v = f_csr
+                loop_total = np.asarray(loop_total, dtype=np.int32)
+            elif isinstance(f, np.ndarray) and f.ndim == 2:
+                loop_total = np.full(len(f), f.shape[1], dtype=np.int32)
+                loop_v = f.reshape(-1)
+            else:
+                loop_total = np.array([len(x) for x in f], dtype=np.int32)
+                loop_v = np.concatenate([np.asarray(x).reshape(-1) for x in f])
+            loop_start = (np.cumsum(loop_total) - loop_total).astype(np.int32)
+            msh.loops.add(len(loop_v))
+            msh.loops.foreach_set('vertex_index', np.ascontiguousarray(loop_v, dtype=np.int32))
+            msh.polygons.add(len(loop_total))
+            msh.polygons.foreach_set('loop_start', loop_start)
+            if bpy.app.version < (4, 0, 0): # loop_total is derived from loop_start in blender 4
+                msh.polygons.foreach_set('loop_total', loop_total)
+
+        if calc_edges is None:
+            calc_edges = e is None or len(e) == 0
+        if has_faces and not calc_edges:
+            msh.loops.foreach_set('edge_index', self._loop_edges(loop_start, loop_total, loop_v, e, len(v)))
+        msh.update(calc_edges=has_faces and bool(calc_edges)) # calc_edges sets the edge_index of face corners
+        for attr_name, values in (attributes or {}).items():
+            if isinstance(values, tuple): # (values, domain)
+                self.set_attribute(attr_name, *values)
+            else:
+                self.set_attribute(attr_name, values)
+        self.cache_clear()
+        return self
+
+    @staticmethod
+    def _loop_edges(loop_start, loop_total, loop_v, e, n_v):
+        """Index in e (nEx2) of the edge from each face corner to the next one."""
+        loop_v = np.asarray(loop_v, dtype=np.int64)
+        loop_next = np.arange(1, len(loop_v)+1)
+        loop_next[loop_start + loop_total - 1] = loop_start # last corner of each face wraps around
+        loop_key = np.minimum(loop_v, loop_v[loop_next])*n_v + np.maximum(loop_v, loop_v[loop_next])
+        e = np.asarray(e, dtype=np.int64)
+        e_key = np.min(e, axis=1)*n_v + np.max(e, axis=1)
+        order = np.argsort(e_key)
+        pos = np.minimum(np.searchsorted(e_key[order], loop_key), len(e_key)-1)
+        missing = e_key[order][pos] != loop_key
+        if np.any(missing):
+            raise ValueError('{} face edges are not in e, pass calc_edges=True to add them'.format(len(np.unique(loop_key[missing]))))
+        return np.ascontiguousarray(order[pos], dtype=np.int32)
+
+    def set_attribute(self, attr_name, values, domain=None):
+        """
+        Write a generic attribute (scalars, vectors, colors) or a UV map from a numpy array.
+        The attribute is created if it doesn't exist.
+
+        :param values: (array) n or nxk, where n is the number of vertices, faces, or face corners (loops)
+            k=1 -> FLOAT (INT, BOOLEAN for integer and boolean arrays), k=2 -> FLOAT2, k=3 -> FLOAT_VECTOR, k=4 -> FLOAT_COLOR
+            FLOAT2 values on face corners become a UV map
+        :param domain: ('POINT', 'FACE', 'CORNER') default: guessed from n, in that order
+        """
+        msh = self()
+        values = np.asarray(values)
+        n = len(values)
+        width = 1 if values.ndim == 1 else values.shape[1]
+        assert width in (1, 2, 3, 4)
+        if domain is None:
+            counts = (('POINT', len(msh.vertices)), ('FACE', len(msh.polygons)), ('CORNER', len(msh.loops)))
+            domain = next((d for d, cnt in counts if cnt == n), None)
+            if domain is None:
+                raise ValueError('{} has {} rows, but the mesh has {}'.format(attr_name, n, ', '.join('{} {}'.format(cnt, d.lower()) for d, cnt in counts)))
+        if width == 2 and domain == 'CORNER':
+            uv = msh.uv_layers.get(attr_name)
+            if uv is None:
+                uv = msh.uv_layers.new(name=attr_name)
+            uv.data.foreach_set('uv', np.ascontiguousarray(values, dtype=np.float32).reshape(-1))
+            return self
+        if width == 1 and values.dtype == bool:
+            attr_type, dtype = 'BOOLEAN', bool
+        elif width == 1 and np.issubdtype(values.dtype, np.integer):
+            attr_type, dtype = 'INT', np.int32
+        else:
+            attr_type, dtype = {1: 'FLOAT', 2: 'FLOAT2', 3: 'FLOAT_VECTOR', 4: 'FLOAT_COLOR'}[width], np.float32
+        attr = msh.attributes.get(attr_name)
+        if attr is None or attr.data_type != attr_type or attr.domain != domain:
+            if attr is not None:
+                msh.attributes.remove(attr)
+            attr = msh.attributes.new(attr_name, attr_type, domain)
+        prop = {1: 'value', 2: 'vector', 3: 'vector', 4: 'color'}[width]
+        attr.data.foreach_set(prop, np.ascontiguousarray(values, dtype=dtype).reshape(-1))
+        msh.update()
+        return self
+
+    def get_v(self, idx=None, out=None, dtype=np.float64):
+        """
+        Read vertex coordinates in one pass using foreach_get.
+
+        :param idx: (array of int) return only these vertices (default: all vertices)
+        :param out: (numpy array) write the coordinates into this buffer instead of allocating a new one
+            A C-contiguous nVx3 float32 buffer is filled by blender directly, without any conversion.
+        :param dtype: np.float64 (default) or np.float32 (blender's native precision)
+        Example:
+            buf = np.empty((m.nV, 3), dtype=np.float32)
+            m.get_v(out=buf) # re-use buf in a loop to avoid allocations
+            m.get_v(idx=[0, 5, 7])
+        """
+        vertices = self().vertices
+        if idx is None and out is not None and out.dtype == np.float32 and out.flags.c_contiguous and out.shape == (len(vertices), 3):
+            vertices.foreach_get('co', out.reshape(-1))
+            return out
+        co = _foreach_get(vertices, 'co', 3)
+        if idx is not None:
+            co = co[idx]
+        if out is not None:
+            out[...] = co
+            return out
+        return co.astype(dtype, copy=False)
+
+    def set_v(self, co, idx=None, record=True):
+        """
+        Write vertex coordinates in one pass using foreach_set.
+
+        :param co: (numpy array) nVx3 coordinates, or len(idx)x3 coordinates if idx is specified
+        :param idx: (array of int) write only these vertices (default: all vertices)
+        :param record: (bool) add this change to the undo history
+        """
+        vertices = self().vertices
+        v_prev = _foreach_get(vertices, 'co', 3)
+        if self._v_init is None:
+            self._v_init = v_prev.astype(np.float64)
+        v_new = v_prev.copy()
+        if idx is None:
+            assert np.shape(co) == (len(vertices), 3)
+            v_new[:] = co
+        else:
+            v_new[idx] = co
+        if record and self.history_len > 0:
+            changed = np.flatnonzero(np.any(v_new != v_prev, axis=1))
+            self._undo.append((changed, v_prev[changed]))
+            del self._undo[:-self.history_len]
+            self._redo = []
+        vertices.foreach_set('co', v_new.reshape(-1))
+        self().update()
+        if self().get(self.primitive_tag) is not None: # an edited primitive is no longer shared by new.easycreate
+            del self()[self.primitive_tag]
+        self.cache_clear(geometry_only=True)
+        env.update()
+
     @property
     def v(self):
         """Coordinates of a mesh as an nVx3 numpy array."""
-        return np.array([v.co for v in self().vertices])
+        return self.get_v()
     
     @v.setter
     def v(self, thisCoords):
         """
         Set vertex positions of a mesh using a numpy array of size nVertices x 3.
         Note that this will only work when blender 3D viewport is in object mode.
-        Therefore, this code will temporarily change the 3D viewport mode to Object,
-        change the mesh coordinates and switch it back.
         """
-        self.v_bkp = copy.deepcopy(self.v) # for undo
-        for vertexCount, vertex in enumerate(self().vertices):
-            vertex.co = mathutils.Vector(thisCoords[vertexCount, :])
-        bpy.context.view_layer.update()
+        self.set_v(thisCoords)
     
     @property
     def vertex_center(self):
@@ -701,78 +1210,200 @@ class Mesh(Thing):
         Return the center of all vertices.
         This was originally 'center' which was confusing.
         """
-        return np.mean(self.v, axis=0)
+        return np.mean(self.get_v(), axis=0)
 
     @vertex_center.setter
     def vertex_center(self, new_center):
-        self.v = self.v + new_center - self.vertex_center
+        v = self.get_v()
+        self.set_v(v + new_center - np.mean(v, axis=0))
+
+    def _cached(self, key, func):
+        """
+        Return the value of func, computed once and cached under key.
+        The whole cache is dropped when the number of vertices, edges,
+        loops or faces changes. Geometry arrays are dropped when the
+        depsgraph reports a geometry update of the mesh (see
+        env.geometry_generation). Cached arrays are read-only.
+        """
+        msh = self()
+        signature = (len(msh.vertices), len(msh.edges), len(msh.loops), len(msh.polygons))
+        geometry = env.geometry_generation(msh)
+        if self._cache.get('signature') != signature:
+            self._cache = {'signature': signature, 'geometry': geometry}
+        elif self._cache.get('geometry') != geometry:
+            self.cache_clear(geometry_only=True)
+            self._cache['geometry'] = geometry
+        if key not in self._cache:
+            val = func()
+            for arr in (val if isinstance(val, (tuple, list)) else (val,)):
+                if isinstance(arr, np.ndarray):
+                    arr.flags.writeable = False
+            self._cache[key] = val
+        return self._cache[key]
+
+    def cache_clear(self, geometry_only=False):
+        """
+        Clear cached topology and geometry arrays.
+        Writing coordinates through bpn, and depsgraph geometry updates
+        do this automatically. Call this after editing the mesh outside
+        bpn without a view layer update, or after changing the topology
+        without changing the number of elements.
+        :param geometry_only: (bool) keep arrays that depend only on topology (f, f_csr, e)
+        """
+        if geometry_only:
+            for key in ('vn', 'fn', 'fa', 'fc', 'eL', 'tri'):
+                self._cache.pop(key, None)
+        else:
+            self._cache = {}
 
     @property
     def vn(self):
         """Vertex normals as an nVx3 numpy array."""
-        return np.array([vert.normal[:] for vert in self().vertices])
-    
+        return self._cached('vn', lambda: _foreach_get(self().vertices, 'normal', 3).astype(np.float64))
+
+    @property
+    def f_csr(self):
+        """
+        Faces in a compressed sparse row layout, useful for meshes with mixed polygon sizes.
+        Returns (loop_start, loop_total, vertex_indices) such that the vertices of face i are
+            vertex_indices[loop_start[i]:loop_start[i]+loop_total[i]]
+        """
+        def _f_csr():
+            msh = self()
+            loop_start = _foreach_get(msh.polygons, 'loop_start', dtype=np.int32)
+            loop_total = _foreach_get(msh.polygons, 'loop_total', dtype=np.int32)
+            loop_vertex = _foreach_get(msh.loops, 'vertex_index', dtype=np.int32)
+            # loops re-ordered by face, in case blender's loop_start is not monotonic
+            offsets = np.cumsum(loop_total, dtype=np.int64) - loop_total
+            vertex_indices = loop_vertex[np.repeat(loop_start - offsets, loop_total) + np.arange(np.sum(loop_total))]
+            return offsets, loop_total, vertex_indices
+        return self._cached('f_csr', _f_csr)
+
     @property
     def f(self):
-        """Faces as an nFx3 numpy array."""
-        return np.array([polygon.vertices[:] for polygon in self().polygons], dtype=object)
+        """
+        Faces as an nFxk numpy array when every face has k vertices.
+        For meshes with mixed polygon sizes, a list of arrays (see f_csr).
+        """
+        def _f():
+            loop_start, loop_total, vertex_indices = self.f_csr
+            if not loop_total.size:
+                return np.empty((0, 3), dtype=np.int32)
+            if np.all(loop_total == loop_total[0]):
+                return vertex_indices.reshape(-1, loop_total[0])
+            return np.split(vertex_indices, loop_start[1:])
+        return self._cached('f', _f)
 
     @property
     def fn(self):
         """Face normals as an nFx3 numpy array."""
-        return np.array([polygon.normal[:] for polygon in self().polygons])
+        return self._cached('fn', lambda: _foreach_get(self().polygons, 'normal', 3).astype(np.float64))
         
     @property
     def fa(self):
-        """Area of faces as an nFx3 numpy array."""
-        return np.array([polygon.area for polygon in self().polygons])
+        """Area of faces as an nF numpy array."""
+        return self._cached('fa', lambda: _foreach_get(self().polygons, 'area').astype(np.float64))
     
     @property
     def fc(self):
         """Coordinates of face centers."""
-        return np.array([polygon.center for polygon in self().polygons])
+        return self._cached('fc', lambda: _foreach_get(self().polygons, 'center', 3).astype(np.float64))
+
+    @property
+    def tri(self):
+        """
+        Vertex indices of triangles as an nTx3 numpy array.
+        Faces with more than 3 vertices are split using blender's loop triangles.
+        """
+        def _tri():
+            msh = self()
+            msh.calc_loop_triangles()
+            return _foreach_get(msh.loop_triangles, 'vertices', 3, dtype=np.int32)
+        return self._cached('tri', _tri)
 
     @property
     def e(self):
         """Vertex indices of edges."""
-        return np.array([edge.vertices[:] for edge in self().edges])
+        return self._cached('e', lambda: _foreach_get(self().edges, 'vertices', 2, dtype=np.int32))
 
     @property
     def eL(self):
         """Edge lengths."""
-        e = self.e
-        v = self.v
-        # This will take forever! Need a better way
-        return [np.sqrt(np.sum(np.diff(v[k], axis=0)**2)) for k in e]
+        def _eL():
+            v = self.get_v()
+            e = self.e
+            return np.linalg.norm(v[e[:, 1]] - v[e[:, 0]], axis=1)
+        return self._cached('eL', _eL)
 
     @property
     def nV(self):
         """Number of vertices."""
-        return np.shape(self.v)[0]
+        return len(self().vertices)
 
     @property
     def nF(self):
         """Number of faces."""
-        return np.shape(self.f)[0]
+        return len(self().polygons)
 
     @property
     def nE(self):
         """Number of edges."""
-        return np.shape(self.e)[0]
+        return len(self().edges)
+
+    @property
+    def v_init(self):
+        """Coordinates before the first change made through bpn."""
+        if self._v_init is None:
+            return self.get_v()
+        return self._v_init.copy()
+
+    @property
+    def v_bkp(self):
+        """Coordinates before the last recorded change."""
+        v = self.get_v()
+        if self._undo:
+            idx, v_old = self._undo[-1]
+            v[idx] = v_old
+        return v
+
+    def undo(self, n=1):
+        """
+        Undo the last n changes to coords.
+        At most history_len changes can be undone.
+        Returns False if there was nothing (more) to undo.
+        """
+        return self._swap_history(self._undo, self._redo, n)
+
+    def redo(self, n=1):
+        """
+        Redo the last n changes undone with undo.
+        Returns False if there was nothing (more) to redo.
+        """
+        return self._swap_history(self._redo, self._undo, n)
 
-    def undo(self):
+    def _swap_history(self, src, trg, n):
         """
-        Undo the last change to coords.
-        Repeated application of undo will keep switching between the
-        last two views.
+        Write the coordinates stored in the last n entries of src, and
+        move the coordinates they replace to trg (one array per entry).
         """
-        self.v, self.v_bkp = self.v_bkp, self.v
+        for _ in range(n):
+            if not src:
+                return False
+            idx, co = src.pop()
+            trg.append((idx, self.get_v(idx=idx, dtype=np.float32)))
+            self.set_v(co, idx, record=False)
+        return True
+
+    def clear_history(self):
+        """Forget all changes recorded for undo/redo."""
+        self._undo = []
+        self._redo = []
 
     def reset(self):
         """Reset the mesh to its initalized state"""
         self.v = self.v_init
 
-    def inflate(self, pres=0.2, elas=0.1, delta=0.05, nIter=20):
+    def inflate(self, pres=0.2, elas=0.1, delta=0.05, nIter=20, preview=0):
         """
         Inflate a mesh towards a sphere
 
@@ -787,24 +1418,58 @@ class Mesh(Thing):
         F_p = np.sum(fn[tNei[i]], 0)
         Then, try
         m.inflate(1, 0.1, 0.5, 150)
-        """
-        newV = self.v
-        f = self.f
-        e = self.e
-        nV = self.nV
-
-        fnv = [self.fnv(f, i) for i in range(nV)] # face neighbors of vertices
-        vnv = [self.vnv(e, i) for i in range(nV)] # vertex neighbors of vertices
-        for _ in range(nIter):
-            fn = self.fn
-            fa = self.fa
-            for i in range(self.nV):
-                F_el = np.sum(newV[vnv[i]] - newV[i], 0) # elastic force vector
-                F_p = np.sum(fn[fnv[i]].T*fa[fnv[i]], 1) # pressure force vector
-                F = elas*F_el + pres*F_p # sum of elastic and pressure forces
-                newV[i] = newV[i] + delta*F
-            self.v = newV
-        
+
+        :param preview: (int) write coordinates back to blender every preview iterations.
+            By default (0), only the final result is written.
+        """
+        newV = self.get_v()
+        adj = self.adjacency
+        deg = np.asarray(adj.sum(axis=1)).ravel()[:, np.newaxis]
+        vf = self.vf_incidence
+        loop_start, _, loop_v = self.f_csr
+        loop_next = self._loop_next
+        for iter_count in range(nIter):
+            # area-weighted face normals from the current coordinates (Newell's method)
+            fna = 0.5*np.add.reduceat(np.cross(newV[loop_v], newV[loop_next]), loop_start, axis=0)
+            F_el = adj @ newV - deg*newV # elastic force vectors
+            F_p = vf @ fna # pressure force vectors
+            newV += delta*(elas*F_el + pres*F_p) # sum of elastic and pressure forces
+            if preview and (iter_count+1) % preview == 0 and iter_count+1 < nIter:
+                self.set_v(newV)
+        self.set_v(newV)
+
+    @property
+    def adjacency(self):
+        """Vertex-vertex adjacency as an nVxnV sparse matrix."""
+        def _adjacency():
+            e = self.e.astype(np.int64)
+            nV = self.nV
+            adj = sparse.coo_matrix((np.ones(2*len(e)), (np.r_[e[:, 0], e[:, 1]], np.r_[e[:, 1], e[:, 0]])), shape=(nV, nV)).tocsr()
+            adj.data[:] = 1.0
+            return adj
+        return self._cached('adjacency', _adjacency)
+
+    @property
+    def vf_incidence(self):
+        """Vertex-face incidence as an nVxnF sparse matrix."""
+        def _vf_incidence():
+            _, loop_total, loop_v = self.f_csr
+            nF = len(loop_total)
+            vf = sparse.coo_matrix((np.ones(len(loop_v)), (loop_v, np.repeat(np.arange(nF), loop_total))), shape=(self.nV, nF)).tocsr()
+            vf.data[:] = 1.0
+            return vf
+        return self._cached('vf_incidence', _vf_incidence)
+
+    @property
+    def _loop_next(self):
+        """Vertex index of the next loop in each face (same layout as f_csr)."""
+        def _next():
+            loop_start, loop_total, loop_v = self.f_csr
+            nxt = np.arange(1, len(loop_v)+1)
+            nxt[loop_start + loop_total - 1] = loop_start
+            return loop_v[nxt]
+        return self._cached('loop_next', _next)
+
     def fnv(self, f, i):
         """Face neighbors of a vertex i.
         Faces attached to vertex i, given faces f."""
@@ -817,9 +1482,18 @@ class Mesh(Thing):
 
     def export(self, fName=None, fPath=None):
         """
-        Export a core.Mesh instance into an stl file.
-        REMEMBER: This only works if the mesh has ONLY triangular faces.
+        Export a core.Mesh instance into a binary stl file.
+        Faces with more than 3 vertices are triangulated while writing. The mesh is not modified.
+        Returns the full path of the file.
         """
+        fName = self.export_path(fName, fPath)
+        if fName is None:
+            return None
+        vef.write_stl(fName, self.get_v(dtype=np.float32), self.tri, header=self().name)
+        return fName
+
+    def export_path(self, fName=None, fPath=None):
+        """Full path of the stl file for export. Returns None if the file name is invalid."""
         if fPath is None:
             fPath = utils.PATH['cache']
 
@@ -828,41 +1502,14 @@ class Mesh(Thing):
 
         if fName.lower()[-4:] != '.stl':
             print('File name should end with a .stl')
-            return
+            return None
 
         # if the full path is supplied as the first argument
         if os.path.dirname(fName):
             if os.path.exists(os.path.dirname(fName)):
                 fPath = os.path.dirname(fName)
         fName = os.path.basename(fName)
-
-        # generate faces for blender's write_stl function
-        # faces: iterable of tuple of 3 vertex, vertex is tuple of 3 coordinates as float
-        # faces = [f1: (v1:(p11, p12, p13), v2:(p21, p22, p23), v3:(p31, p32, p33)), f2:...]
-        # poke faces that have more than 3 coordinates (only for saving)
-        tmp_self_flag = False
-        if any([np.size(x) > 3 for x in self.f]): # if not every face is a 3-gon, then poke faces
-            tmp_self_flag = True
-            tmp_self = Mesh(self().copy())
-            bm = bmesh.new()
-            bm.from_mesh(tmp_self())
-            # only poke a face if it has more than 3 vertices
-            bmesh.ops.poke(bm, faces=[x for x in bm.faces if len(x.verts[:]) > 3])
-            bm.to_mesh(tmp_self())
-            bm.free()
-
-        v = [tuple(v.co) for v in tmp_self().vertices]
-        f = [tuple(polygon.vertices[:]) for polygon in tmp_self().polygons]
-
-        faces = []
-        for face in f:
-            thisFace = []
-            for vPos in face:
-                thisFace.append(v[vPos])
-            faces.append(tuple(thisFace))
-        write_stl(filepath=os.path.join(fPath, fName), faces=faces, ascii=False)
-        if tmp_self_flag:
-            -tmp_self
+        return os.path.join(fPath, fName)
     
     def morph(self, n_frames=50, frame_start=1, v_orig=None, v_targ=None):
         """
@@ -876,7 +1523,7 @@ class Mesh(Thing):
         frame_end = frame_start + n_frames
         def my_handler(scene):
             p = (scene.frame_current-frame_start)/(frame_end-frame_start)
-            self.v = (1-p)*v_orig + p*v_targ
+            self.set_v((1-p)*v_orig + p*v_targ, record=False)
         my_handler.__doc__ = self.name # so we know which object the handler belongs to
         bpy.app.handlers.frame_change_pre.append(my_handler)
         return my_handler
@@ -930,10 +1577,11 @@ class CompoundObject(Object):
     https://docs.blender.org/manual/en/latest/scene_layout/object/types.html
     """
     def __new__(cls, name, obj_type, *args, **kwargs): #pylint: disable=unused-argument
-        if name in [o.name for o in bpy.data.objects]:
+        obj = bpy.data.objects.get(name) if isinstance(name, str) else None
+        if obj is not None:
             # If an object with that name exists in the blender env, assert that it is the correct type
             # the 'new' module should ensure this doesn't happen, so this is here as an additional check
-            assert bpy.data.objects[name].type == obj_type
+            assert obj.type == obj_type
         return super().__new__(cls, name, *args, **kwargs)
 
     def __init__(self, name, obj_type, data_class, *args, **kwargs):
@@ -961,7 +1609,7 @@ class CompoundObject(Object):
             new_data = new_data.name
         self._data = self._data_class(new_data)
         self().data = self.data() # pylint:disable=not-callable # replace the blender data
-        bpy.context.view_layer.update()
+        env.update()
 
 
 @utils.PortProperties(Mesh, 'data') # instance of MeshObject MUST have 'data' attribute/property that is an instance of Mesh class
@@ -980,10 +1628,98 @@ class MeshObject(CompoundObject):
     def __init__(self, name, *args, **kwargs):
         super().__init__(name, 'MESH', Mesh, *args, **kwargs)
 
+    def own_data(self, msh_name=None):
+        """
+        Give this object its own copy of the mesh if the mesh is shared
+        with other objects. Use deepcopy to copy the object as well.
+        """
+        msh = self().data
+        if msh.users > 1:
+            msh = msh.copy()
+            self.data = msh
+        if msh.get(Mesh.primitive_tag) is not None:
+            del msh[Mesh.primitive_tag]
+        if isinstance(msh_name, str):
+            self.data.name = msh_name
+        return self
+
+    @property
+    def v(self):
+        """Coordinates of the mesh as an nVx3 numpy array."""
+        return self.data.get_v()
+
+    @v.setter
+    def v(self, co):
+        self.set_v(co)
+
+    def copy_on_edit(self):
+        """
+        Called before Mesh methods that change the mesh.
+        Gives this object its own mesh if the mesh is a primitive shared
+        by new.easycreate (tagged with Mesh.primitive_tag). Meshes shared
+        on purpose (e.g. new.mesh(msh_name=...)) are edited in place.
+        """
+        if self().data.get(Mesh.primitive_tag) is not None:
+            self.own_data()
+        return self
+
+    def set_v(self, co, idx=None, record=True):
+        """
+        Set vertex coordinates. See Mesh.set_v
+        Shared primitive meshes are copied on the first edit.
+        """
+        self.copy_on_edit().data.set_v(co, idx, record)
+
+    # Mesh methods that change the mesh, copy a shared primitive first (see copy_on_edit)
+    @property
+    def vertex_center(self):
+        """Center of all vertices. See Mesh.vertex_center"""
+        return self.data.vertex_center
+
+    @vertex_center.setter
+    def vertex_center(self, new_center):
+        self.copy_on_edit().data.vertex_center = new_center
+
+    def fill(self, *args, **kwargs):
+        """See Mesh.fill"""
+        return self.copy_on_edit().data.fill(*args, **kwargs)
+
+    def set_attribute(self, *args, **kwargs):
+        """See Mesh.set_attribute"""
+        return self.copy_on_edit().data.set_attribute(*args, **kwargs)
+
+    def undo(self, n=1):
+        """See Mesh.undo"""
+        return self.copy_on_edit().data.undo(n)
+
+    def redo(self, n=1):
+        """See Mesh.redo"""
+        return self.copy_on_edit().data.redo(n)
+
+    def reset(self):
+        """See Mesh.reset"""
+        return self.copy_on_edit().data.reset()
+
+    def inflate(self, *args, **kwargs):
+        """See Mesh.inflate"""
+        return self.copy_on_edit().data.inflate(*args, **kwargs)
+
+    def morph(self, *args, **kwargs):
+        """See Mesh.morph"""
+        return self.copy_on_edit().data.morph(*args, **kwargs)
+
+    def update_normals(self):
+        """See Mesh.update_normals"""
+        return self.copy_on_edit().data.update_normals()
+
+    def shade(self, typ='smooth'):
+        """See Mesh.shade"""
+        return self.copy_on_edit().data.shade(typ)
+
     @property
     def pts(self):
         """Return vertices as a cf.PointCloud object."""
-        return cf.PointCloud(self.data.v, self.frame)
+        return cf.PointCloud(self.data.get_v(), self.frame)
 
     @pts.setter
     def pts(self, new_pts):
@@ -993,7 +1729,7 @@ class MeshObject(CompoundObject):
         it here.
         """
         assert isinstance(new_pts, cf.PointCloud)
-        self.data.v = new_pts.co
+        self.set_v(new_pts.co)
         self.frame = new_pts.frame
     
     def apply_matrix(self):
@@ -1003,11 +1739,10 @@ class MeshObject(CompoundObject):
         It also resets matrix_world
         Note that this move will move the mesh center to origin.
         """
-        bpy.context.view_layer.update()
-        self.data.v_bkp = self.data.v # for undoing
-        self.data.v = cf.apply_matrix(self().matrix_world, self.data.v)
+        env.update(force=True) # matrix_world must be current
+        self.set_v(cf.apply_matrix(self().matrix_world, self.data.get_v())) # can be undone with self.data.undo()
         self().matrix_world = mathutils.Matrix(np.eye(4))
-        bpy.context.view_layer.update()
+        env.update()
         return self
 
     def apply_modifiers(self):
@@ -1028,25 +1763,25 @@ class MeshObject(CompoundObject):
         assert slice_dir in ('pos', 'neg')
         if isinstance(axis, str):
             axis = {'x':0, 'y':1, 'z':2}[axis]
-        self.data.v_bkp = self.data.v
-
         # apply matrix, do your thing, apply inverse, then put the original matrix back in
         m = self().matrix_world.copy()
         mi = m.copy()
         mi.invert()
         self.apply_matrix()
 
-        v = self.data.v
+        v = self.data.get_v()
         if slice_dir == 'neg':
-            v[v[:, axis] < 0, axis] = 0
+            idx = np.flatnonzero(v[:, axis] < 0)
         else: 
-            v[v[:, axis] > 0, axis] = 0
-        self.data.v = v
+            idx = np.flatnonzero(v[:, axis] > 0)
+        v_sliced = v[idx]
+        v_sliced[:, axis] = 0
+        self.data.set_v(v_sliced, idx)
 
         self().matrix_world = mi
         self.apply_matrix()
         self().matrix_world = m
-        bpy.context.view_layer.update()
+        env.update()
         return self
 
     slice_x = functools.partialmethod(slice_ax, axis='x')
@@ -1073,13 +1808,23 @@ class MeshObject(CompoundObject):
 
 
 class GreasePencil(Thing):
-    """Wrapper around blender's grease pencil."""
+    """
+    Wrapper around blender's grease pencil.
+
+    Keyframes and strokes are indexed by (layer name, frame number, stroke index).
+    The keyframe index is updated when keyframes are made through bpn.
+    After adding, moving or removing keyframes in blender (or with bpy),
+    call keyframe_map_rebuild. The stroke index is rebuilt when a stroke
+    is not found.
+    """
     def __new__(cls, name, **kwargs): #pylint: disable=arguments-differ
         return super().__new__(cls, name, **kwargs)
 
     def __init__(self, name, **kwargs):
         super().__init__(name, 'GreasePencil', **kwargs)
         if not hasattr(self, '_layer'):
+            self._frames = {} # layer name -> {frame number: keyframe}
+            self._stroke_keys = {} # stroke pointer -> (layer name, frame number, stroke index)
             self._layer = None
             self._keyframe = None
 
@@ -1104,7 +1849,7 @@ class GreasePencil(Thing):
         Returns a reference to an existing layer.
         Creates a layer if it doesn't exist.
         """
-        if layer_name in [l.info for l in self().layers]:
+        if self().layers.get(layer_name) is not None:
             self._layer = self().layers[layer_name]
         else:
             self._layer = self().layers.new(layer_name)
@@ -1113,6 +1858,7 @@ class GreasePencil(Thing):
     def layer_clear(self):
         """Remove all strokes from all frames in the current layer"""
         self.layer.clear() # removes all keyframes and strokes
+        self._frames[self.layer.info] = {}
 
     @property
     def keyframe(self):
@@ -1127,9 +1873,72 @@ class GreasePencil(Thing):
         Inserts a keyframe in the current layer if there isn't one.
         """
         assert isinstance(keynum, int)
-        if keynum not in [kf.frame_number for kf in self.layer.frames]:
-            self._layer.frames.new(keynum)
-        self._keyframe = [kf for kf in self.layer.frames if kf.frame_number == keynum][0]
+        kf = self.get_keyframe(keynum)
+        if kf is None:
+            kf = self._layer.frames.new(keynum)
+            self._frame_map(self._layer.info)[keynum] = kf
+        self._keyframe = kf
+
+    def _frame_map(self, layer_name):
+        """
+        Frame number -> keyframe of a layer. Made on first use, and
+        updated when bpn adds or clears keyframes.
+        Keyframes are not ID datablocks, and references to keyframes
+        removed in blender point to freed memory. So, the map is never
+        checked against blender (that would walk the keyframes on every
+        lookup). Use keyframe_map_rebuild after editing keyframes outside bpn.
+        """
+        if layer_name not in self._frames:
+            self._frames[layer_name] = {kf.frame_number: kf for kf in self().layers[layer_name].frames}
+        return self._frames[layer_name]
+
+    def keyframe_map_rebuild(self, layer=None):
+        """
+        Re-read the keyframes of a layer (default: all layers) from blender.
+        Call this after adding, moving or removing keyframes outside bpn.
+        """
+        layer_names = self.layers if layer is None else [layer]
+        for layer_name in layer_names:
+            self._frames.pop(layer_name, None)
+            self._frame_map(layer_name)
+        self._stroke_keys = {}
+
+    def get_keyframe(self, keynum, layer=None):
+        """
+        Keyframe at frame number keynum in a layer (default: current layer).
+        Returns None if there is no keyframe.
+        Keyframes edited outside bpn are seen after keyframe_map_rebuild.
+        """
+        layer_name = self.layer.info if layer is None else layer
+        if self().layers.get(layer_name) is None:
+            return None
+        return self._frame_map(layer_name).get(keynum)
+
+    def get_stroke(self, index=-1, keynum=None, layer=None):
+        """
+        Stroke number index in a keyframe (default: current keyframe) of a layer (default: current layer).
+        Returns None if it doesn't exist.
+        """
+        kf = self.keyframe if keynum is None else self.get_keyframe(keynum, layer)
+        if kf is None or not -len(kf.strokes) <= index < len(kf.strokes):
+            return None
+        return kf.strokes[index]
+
+    def _register_stroke(self, gp_stroke, keyframe, layer_name):
+        """Add a stroke made through bpn to the index."""
+        self._stroke_keys[gp_stroke.as_pointer()] = (layer_name, keyframe.frame_number, len(keyframe.strokes)-1)
+
+    def stroke_key(self, gp_stroke):
+        """(layer name, frame number, stroke index) of a stroke."""
+        key = self._stroke_keys.get(gp_stroke.as_pointer())
+        if key is None or self.get_stroke(key[2], key[1], key[0]) != gp_stroke: # rebuild the index
+            self._stroke_keys = {}
+            for layer in self().layers:
+                for kf in layer.frames:
+                    for i, stroke in enumerate(kf.strokes):
+                        self._stroke_keys[stroke.as_pointer()] = (layer.info, kf.frame_number, i)
+            key = self._stroke_keys[gp_stroke.as_pointer()]
+        return key
     
     def keyframe_clear(self):
         """Clear the current keyframe in the current layer."""
@@ -1150,7 +1959,10 @@ class GreasePencil(Thing):
 
     @property
     def strokes(self):
-        """Return a list of all the strokes."""
+        """
+        Return a dictionary of all the strokes (layer_key0001_stroke000: stroke).
+        Walks through all strokes. Use get_stroke to retrieve one stroke.
+        """
         ret = {}
         for layer in self().layers:
             for kf in layer.frames:
@@ -1200,7 +2012,7 @@ class GreasePencilObject(CompoundObject):
         string - material name
         integer - cycle through colors in COLOR LIST, which defaults to the matplotlib color cycler 
             Note that older versions of this code interpreted the integer as blender's material index)
-        tuple - 4-element tuple : select the closest color
+        tuple - rgb(a) tuple : material named by its hex code, e.g. '#ff0000ff'
         dict - create new material
             one key, value pair {name: 4-tuple rgba}
             if material with that name exists, print a warning and DO NOTHING
@@ -1210,6 +2022,9 @@ class GreasePencilObject(CompoundObject):
             # color_name = {i : m.name for i, m in enumerate(self().material_slots)}[this_color]
             this_color = COLOR_LIST[this_color % len(COLOR_LIST)]
 
+        if isinstance(this_color, tuple):
+            this_color = mc.to_hex(this_color, keep_alpha=True)
+
         if isinstance(this_color, dict):
             assert len(this_color) == 1 # supply only one color at a time?'
             key = list(this_color.keys())[0] # key is the name
@@ -1225,8 +2040,6 @@ class GreasePencilObject(CompoundObject):
             color_name = key
         if isinstance(this_color, str):
             if this_color == 'random':
-                import matplotlib.colors as mc
-                import random
                 this_color = random.choice(list(mc.cnames.keys()))
             color_name = this_color  
             # create material if color does not exist
@@ -1271,25 +2084,113 @@ class GreasePencilObject(CompoundObject):
 
         assert isinstance(ptcloud, cf.PointCloud)
         gp_stroke = self.data.keyframe.strokes.new()
+        self.data._register_stroke(gp_stroke, self.data.keyframe, self.data.layer.info) #pylint: disable=protected-access
         gp_stroke.display_mode = kwargs['display_mode']
 
         gp_stroke.points.add(count=ptcloud.n)
-        gp_stroke.points.foreach_set('co', tuple(ptcloud.in_frame(self.frame).co.flatten())) # more efficient
+        gp_stroke.points.foreach_set('co', np.ascontiguousarray(ptcloud.in_frame(self.frame).co, dtype=np.float32).reshape(-1))
         gp_stroke.material_index = self.color_index
         gp_stroke.line_width = kwargs['line_width']
-        n_pts = len(gp_stroke.points[:])
+        n_pts = ptcloud.n
 
         for attr in ('pressure', 'strength'):
             if isinstance(kwargs[attr], (int, float)):
-                kwargs[attr] = kwargs[attr]*np.ones(n_pts)
+                kwargs[attr] = np.full(n_pts, kwargs[attr], dtype=np.float32)
             else:
                 assert len(kwargs[attr]) == n_pts
-            gp_stroke.points.foreach_set(attr, tuple(kwargs[attr]))
+            gp_stroke.points.foreach_set(attr, np.ascontiguousarray(kwargs[attr], dtype=np.float32))
         
         if isinstance(kwargs['keyframe'], (tuple, list)):
             self.data.keyframe = kwargs['keyframe'][1]+1 # if a range was specified, turn off the stroke on the keyframe after the end frame specified
         return gp_stroke
 
+    def stroke_batch(self, ptclouds, keyframes=None, colors=None, pressure=1.0, strength=1.0, line_width=40, layer=None, display_mode='3DSPACE'):
+        """
+        Make many strokes in one call. Use this instead of calling stroke in a loop.
+        All points are transformed into the object's frame with one matrix multiplication.
+        The strokes dictionary of the pencil is still available as self.strokes
+
+        :param ptclouds: list of cf.PointCloud or nx3 arrays (world coordinates),
+            or (co, n_pts) - points of all strokes (Nx3), and the number of points in each stroke
+        :param keyframes: (int, list of int) keyframe of each stroke (default: current keyframe)
+        :param colors: color (see color, including an rgba tuple), or a list with the color of each stroke (default: current color)
+            The current color of the pencil is not changed.
+        :param pressure: scalar, one value per point (N), or a list of arrays (one per stroke)
+        :param strength: same as pressure
+        :param line_width: scalar or one value per stroke
+        :param layer: (str) layer name (default: current layer)
+        Returns a list of blender strokes.
+        Example:
+            p.stroke_batch([pos[f-10:f] for f in range(10, 100)], keyframes=list(range(1, 91)))
+        """
+        if layer is not None:
+            self.data.layer = layer
+        if isinstance(ptclouds, tuple) and len(ptclouds) == 2:
+            co = np.asarray(ptclouds[0], dtype=float).reshape(-1, 3)
+            n_pts = np.asarray(ptclouds[1], dtype=int)
+        else:
+            co = []
+            for ptcloud in ptclouds:
+                if isinstance(ptcloud, cf.PointCloud):
+                    frame_m = np.asarray(ptcloud.frame.m)
+                    ptcloud = ptcloud.co if np.array_equal(frame_m, np.eye(4)) else ptcloud.co @ frame_m[:3, :3].T + frame_m[:3, 3]
+                co.append(np.asarray(ptcloud, dtype=float).reshape(-1, 3))
+            n_pts = np.array([len(c) for c in co], dtype=int)
+            co = np.concatenate(co) if co else np.zeros((0, 3))
+        n_strokes = len(n_pts)
+        assert np.sum(n_pts) == len(co)
+        tfmat = np.linalg.inv(np.array(self().matrix_world)) # world -> object
+        co = np.ascontiguousarray(co @ tfmat[:3, :3].T + tfmat[:3, 3], dtype=np.float32)
+
+        def _per_point(val):
+            if isinstance(val, (int, float)):
+                return np.full(len(co), val, dtype=np.float32)
+            if isinstance(val, (list, tuple)) and len(val) == n_strokes and np.ndim(val[0]) == 1:
+                val = np.concatenate(val)
+            assert len(val) == len(co)
+            return np.ascontiguousarray(val, dtype=np.float32)
+        pressure, strength = _per_point(pressure), _per_point(strength)
+
+        if keyframes is None:
+            keyframes = self.data.keyframe.frame_number
+        keyframes = np.broadcast_to(np.asarray(keyframes, dtype=int), (n_strokes,))
+        line_width = np.broadcast_to(np.asarray(line_width), (n_strokes,))
+        if colors is None:
+            colors = self.color
+        if isinstance(colors, (str, int, dict, tuple)): # one color for all strokes
+            colors = [colors]*n_strokes
+        assert len(colors) == n_strokes
+        material_index = {}
+        prev_color = self._color
+        for color in colors:
+            key = str(color)
+            if key not in material_index:
+                self.color = color
+                material_index[key] = self.color
+        self._color = prev_color # the material slots are in place, only restore the current color
+        slots = {m.name : i for i, m in enumerate(self().material_slots)}
+        material_index = {key: slots[color_name] for key, color_name in material_index.items()}
+
+        offsets = np.concatenate(([0], np.cumsum(n_pts)))
+        ret = []
+        layer_name = self.data.layer.info
+        for i in range(n_strokes):
+            if self.data.keyframe.frame_number != keyframes[i]:
+                self.data.keyframe = int(keyframes[i])
+            kf = self.data.keyframe
+            gp_stroke = kf.strokes.new()
+            self.data._register_stroke(gp_stroke, kf, layer_name) #pylint: disable=protected-access
+            gp_stroke.display_mode = display_mode
+            gp_stroke.material_index = material_index[str(colors[i])]
+            gp_stroke.line_width = int(line_width[i])
+            start, stop = offsets[i], offsets[i+1]
+            gp_stroke.points.add(count=int(stop-start))
+            gp_stroke.points.foreach_set('co', co[start:stop].reshape(-1))
+            gp_stroke.points.foreach_set('pressure', pressure[start:stop])
+            gp_stroke.points.foreach_set('strength', strength[start:stop])
+            ret.append(gp_stroke)
+        return ret
+
 
 class Curve(Thing):
     """
@@ -1363,22 +2264,68 @@ class Stroke:
 
     @v.setter
     def v(self, co):
-        assert np.shape(co) == (self.n, 3)
-        self().points.foreach_set('co', np.reshape(co, self.n*3))
+        """
+        Set point coordinates. Points are added or removed to match the number of rows in co.
+        With fewer rows, the stroke is replaced (see n). Use self() afterwards.
+        """
+        assert np.ndim(co) == 2 and np.shape(co)[1] == 3
+        self.n = len(co)
+        self().points.foreach_set('co', np.ascontiguousarray(co, dtype=np.float32).reshape(-1))
         self().id_data.update_tag()
-        bpy.context.view_layer.update()
+        env.update()
+
+    @n.setter
+    def n(self, n_pts):
+        """
+        Add points to the end of the stroke, or keep only the first n_pts points.
+        Blender reallocates the stroke for every point removed, so a shorter
+        stroke replaces this one instead (see _shrink). Use self() afterwards.
+        """
+        n_now = len(self().points)
+        if n_pts > n_now:
+            self().points.add(count=n_pts - n_now)
+        elif n_pts < n_now:
+            self._shrink(n_pts)
+
+    # copied to the shorter stroke made by _shrink
+    _stroke_attrs = ('display_mode', 'material_index', 'line_width', 'use_cyclic', 'hardness', 'start_cap_mode', 'end_cap_mode', 'vertex_color_fill')
+    _point_attrs = (('co', 3), ('pressure', 1), ('strength', 1), ('vertex_color', 4), ('uv_factor', 1), ('uv_rotation', 1))
+
+    def _shrink(self, n_pts):
+        """
+        Replace the stroke with a new stroke made of its first n_pts points.
+        The new stroke is added at the end of the strokes in the same keyframe.
+        """
+        old = self()
+        pencil = self.parent_pencil
+        layer_name, keynum, _ = pencil.stroke_key(old)
+        kf = pencil.get_keyframe(keynum, layer_name)
+        new = kf.strokes.new()
+        for attr in self._stroke_attrs:
+            if hasattr(old, attr):
+                setattr(new, attr, getattr(old, attr))
+        new.points.add(count=n_pts)
+        if n_pts > 0:
+            for attr, width in self._point_attrs:
+                if hasattr(old.points[0], attr):
+                    new.points.foreach_set(attr, np.ascontiguousarray(_foreach_get(old.points, attr, width)[:n_pts]).reshape(-1))
+        kf.strokes.remove(old)
+        pencil._register_stroke(new, kf, layer_name) #pylint: disable=protected-access
+        self.GPStroke = new
+
+    @property
+    def key(self):
+        """(layer name, frame number, stroke index)"""
+        return self.parent_pencil.stroke_key(self())
 
     @property
     def name(self):
-        all_strokes = GreasePencil(self().id_data).strokes
-        return list(all_strokes.keys())[list(all_strokes.values()).index(self())]
+        layer, keyframe, strokenumber = self.key
+        return layer+'_key{:04d}'.format(keyframe)+'_stroke{:03d}'.format(strokenumber)
 
     @property
     def properties(self):
-        name = self.name
-        keyframe = int(name.split('_')[-2].strip('key'))
-        strokenumber = int(name.split('_')[-1].strip('stroke'))
-        layer = "_".join(name.split('_')[:-2])
+        layer, keyframe, strokenumber = self.key
         return {"object": self.parent_object.name, "pencil": self().id_data.name, "layer": layer, "keyframe": keyframe, "stroke": strokenumber}
 
     @property
@@ -1394,10 +2341,9 @@ class Stroke:
 
     @property
     def parent_layer(self):
-        p = self.properties
-        return self().id_data.layers[p["layer"]]
+        return self().id_data.layers[self.key[0]]
 
     @property
     def parent_keyframe(self):
-        p = self.properties
-        return [f for f in self().id_data.layers[p["layer"]].frames if f.frame_number == p["keyframe"]][0]
+        layer, keyframe, _ = self.key
+        return self.parent_pencil.get_keyframe(keyframe, layer)
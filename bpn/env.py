@@ -4,14 +4,22 @@ Environment control in blender.
 Classes:
     Props       - Snapshot of prop collections in blender's data.
     ReportDelta - Decorator for functions to report changes the function made to blender after execution.
+    ChangeLog   - Context manager recording datablocks updated by the depsgraph.
+    PropIndex   - Sorted name index of all props for fast lookup and regex search (use env.PROP_INDEX)
     Key         - Timeline management (lim and auto_lim are really useful)
+    Batch       - Defer view layer updates made by bpn (use through env.batch or bpn.batch)
 
 Functions:
     reset - Reset the current blender scene programatically (useful to preserve console history and variables)
     clear - clear specific things e.g. - env.clear('actions')
     shade - Change the shading in 3D viewport
     background - Set the backgrund color
+    batch - Context manager/decorator to coalesce view layer updates
+    update - Update the view layer (deferred inside a batch)
+    geometry_generation - Number of depsgraph geometry updates of a mesh (used by core.Mesh caches)
 """
+import bisect
+import contextlib
 import re
 import functools
 import numpy as np
@@ -20,6 +28,53 @@ import bpy #pylint: disable=import-error
 
 PROP_FIELDS = [k for k in dir(bpy.data) if 'bpy_prop_collection' in str(type(getattr(bpy.data, k)))]
 
+def _id_key(id_data):
+    """Integer key of a datablock that is unique in this session."""
+    return getattr(id_data, 'session_uid', None) or id_data.as_pointer()
+
+# incremented when prop names may have changed without changing the number of props
+# (file load, undo, and depsgraph updates that look like renames), see PropIndex
+_names_generation = 0
+_geometry_generation = {} # {mesh key: number of geometry updates}, see geometry_generation
+
+@bpy.app.handlers.persistent
+def _depsgraph_changed(*args):
+    global _names_generation #pylint: disable=global-statement
+    if not (len(args) > 1 and isinstance(args[1], bpy.types.Depsgraph)): # load_post, undo_post, redo_post
+        _names_generation += 1
+        return
+    for upd in args[1].updates: # depsgraph_update_post(scene, depsgraph)
+        if not (upd.is_updated_geometry or upd.is_updated_transform or upd.is_updated_shading or isinstance(upd.id, bpy.types.Scene)):
+            _names_generation += 1 # e.g. a rename in the outliner
+        if not upd.is_updated_geometry:
+            continue
+        id_data = upd.id.original
+        if isinstance(id_data, bpy.types.Object): # e.g. leaving edit mode
+            id_data = id_data.data
+        if isinstance(id_data, bpy.types.Mesh):
+            key = _id_key(id_data)
+            _geometry_generation[key] = _geometry_generation.get(key, 0) + 1
+
+def geometry_generation(msh):
+    """
+    Number of geometry updates of a blender mesh reported by the depsgraph.
+    Changes when the mesh is edited in any way (edit mode, bmesh, operators).
+    """
+    return _geometry_generation.get(_id_key(msh), 0)
+
+for _hdl_list in (bpy.app.handlers.depsgraph_update_post, bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+    for _hdl in [h for h in _hdl_list if getattr(h, '__name__', '') == '_depsgraph_changed']:
+        _hdl_list.remove(_hdl) # in case the module is reloaded
+    _hdl_list.append(_depsgraph_changed)
+
+def _is_valid(id_data):
+    """Return False if the datablock was removed from blender."""
+    try:
+        id_data.name
+        return True
+    except ReferenceError:
+        return False
+
 ### Manage blender resources
 class Props:
     """
@@ -30,6 +85,7 @@ class Props:
 
     Construction:
         :param inp_dict: dict. Meant for internal use by operators.
+        :param fields: list. Only snapshot these prop collections, e.g. ['objects', 'meshes'] (default: PROP_FIELDS)
 
     Usage:
         Props() -> new Props object. Access everything with Props().__dict__
@@ -51,28 +107,31 @@ class Props:
         b.get('Cube') -> Find all Props named 'Cube', returns 
                     list of Props with 'Cube' in their name, irrespective of prop type
                     [bpy.data.meshes['Cube'], bpy.data.objects['Cube']]
-        Props().get('Cube') -> calling this way, as opposed to b.get('Cube') 
-                    doesn't seem to have any difference in performance. So, make
-                    Props objects only to store states.
+        Props().get('Cube') -> works, but Props() snapshots every prop collection.
+                    Make Props objects only to store states, and use
+                    env.PROP_INDEX.get('Cube') for lookups.
     
     Dev note:
-        Don't add any properties to this object. Keep it limited to PROP_FIELDS.
+        Don't add any properties to this object. Keep it limited to prop collection names.
+        Each prop collection is stored as a dict of {session_uid: datablock}.
         TODO: Change to slots?
     """
-    def __init__(self, inp_dict=None):
+    def __init__(self, inp_dict=None, fields=None):
         if not inp_dict:
-            self.__dict__ = {p : set(getattr(bpy.data, p)) for p in PROP_FIELDS}
+            if fields is None:
+                fields = PROP_FIELDS
+            self.__dict__ = {p : {_id_key(k): k for k in getattr(bpy.data, p)} for p in fields}
         else:
             self.__dict__ = inp_dict
     def __or__(self, other): # union
         self.clean()
-        return Props({p:self.__dict__[p].union(other.__dict__[p]) for p in PROP_FIELDS})
+        return Props({p:{**other.__dict__.get(p, {}), **self.__dict__[p]} for p in self.__dict__})
     def __and__(self, other): # intersection
         self.clean()
-        return Props({p:self.__dict__[p].intersection(other.__dict__[p]) for p in PROP_FIELDS})
+        return Props({p:{k:v for k, v in self.__dict__[p].items() if k in other.__dict__.get(p, {})} for p in self.__dict__})
     def __sub__(self, other): # setdiff
         self.clean()
-        return Props({p:self.__dict__[p] - other.__dict__[p] for p in PROP_FIELDS})
+        return Props({p:{k:v for k, v in self.__dict__[p].items() if k not in other.__dict__.get(p, {})} for p in self.__dict__})
     def __xor__(self, other): # exclusive or
         return (self | other) - (self & other)
     def __call__(self, names=None, return_empty=False):
@@ -81,22 +140,23 @@ class Props:
         Example:
             env.Props()(return_empty=True)['meshes']
         """
-        self.clean()
         if isinstance(names, str):
             names = [names]
         if not names:
+            self.clean()
             if return_empty:
-                return {p:list(propset) for p, propset in self.__dict__.items()}
-            return {p:list(propset) for p, propset in self.__dict__.items() if propset != set()}
-        # list of names
+                return {p:list(propset.values()) for p, propset in self.__dict__.items()}
+            return {p:list(propset.values()) for p, propset in self.__dict__.items() if propset}
+        # list of names - look up each name in blender, and keep the props in this snapshot
         res = {}
         for p, propset in self.__dict__.items():
-            if propset != set():
-                res[p] = [prop for prop in propset if prop.name in names]
+            if propset:
+                items = (getattr(bpy.data, p).get(name) for name in dict.fromkeys(names))
+                res[p] = [item for item in items if item is not None and _id_key(item) in propset]
         return {p:proplist for p, proplist in res.items() if proplist}
     def clean(self):
         """Remove invalid objects (i.e., deleted from blender)."""
-        self.__dict__ = {p : {k for k in self.__dict__[p] if 'invalid' not in  str(k)} for p in PROP_FIELDS}
+        self.__dict__ = {p : {k:v for k, v in propset.items() if _is_valid(v)} for p, propset in self.__dict__.items()}
     def get(self, name=''):
         """Get an object by its name."""
         assert isinstance(name, str)
@@ -106,9 +166,8 @@ class Props:
         Return names of props in the environment that match a specific regular expression.
         See get_re for examples
         """
-        all_prop_names = [this_item for this_set in self.names().values() for this_item in this_set]
-        all_matched_names = list(np.unique([i for i in all_prop_names if re.search(name, i)]))
-        return all_matched_names
+        regex = re.compile(name)
+        return sorted({i for this_set in self.names().values() for i in this_set if regex.search(i)})
     def get_re(self, name=''):
         """
         Return all props that fit a regular expression given in name.
@@ -124,7 +183,7 @@ class Props:
     def names(self, discard_empty=True):
         """Return only the names, and not references to objects."""
         self.clean()
-        allNames = {p: {k.name for k in self.__dict__[p]} for p in PROP_FIELDS}
+        allNames = {p: {k.name for k in propset.values()} for p, propset in self.__dict__.items()}
         if discard_empty:
             return {k:v for k, v in allNames.items() if v}
         else:
@@ -149,6 +208,93 @@ class Props:
         return children
 
 
+class PropIndex:
+    """
+    Sorted index of the names of all props in blender's data.
+    Use the module-level instance env.PROP_INDEX
+
+    Lookups by name go straight to bpy.data.<collection>.get. The sorted
+    name list used for regex search is rebuilt lazily, when the number of
+    props in any collection changes, after a file load or undo, or after a
+    depsgraph update that only tags an ID (as renames do). Transform,
+    geometry and shading updates keep the list. Renames that blender does
+    not report are not seen until then (renames through core.Thing.name
+    invalidate the index, or call invalidate).
+
+    Usage:
+        env.PROP_INDEX.get('Cube') -> [bpy.data.meshes['Cube'], bpy.data.objects['Cube']]
+        env.PROP_INDEX.search('^ax') -> sorted names of all props starting with 'ax'
+    """
+    def __init__(self):
+        self._names = None
+        self._signature = None
+
+    def invalidate(self):
+        """Rebuild the name list on next use."""
+        self._names = None
+
+    @property
+    def names(self):
+        """Sorted list of unique names of all props."""
+        signature = (_names_generation, tuple(len(getattr(bpy.data, p)) for p in PROP_FIELDS))
+        if self._names is None or signature != self._signature:
+            self._names = sorted({n for p in PROP_FIELDS for n in getattr(bpy.data, p).keys()})
+            self._signature = signature
+        return self._names
+
+    def get(self, name):
+        """All props with this name (at most one per prop collection)."""
+        return [item for item in (getattr(bpy.data, p).get(name) for p in PROP_FIELDS) if item is not None]
+
+    def get_children(self, obj_name):
+        """Children of an object at the bottom most level. See Props.get_children"""
+        obj = bpy.data.objects.get(obj_name)
+        if obj is None:
+            return set()
+        children = {obj}
+        while any(o.children for o in children):
+            children = {c for o in children for c in (o.children or (o,))}
+        return children
+
+    def search(self, pattern):
+        """
+        Sorted names of props that match a regular expression.
+        Patterns anchored with a literal prefix (e.g. '^ax') only scan names with that prefix.
+        """
+        regex = re.compile(pattern)
+        names = self.names
+        prefix = self._literal_prefix(pattern)
+        if prefix:
+            names = names[bisect.bisect_left(names, prefix):bisect.bisect_left(names, prefix + chr(0x10ffff))]
+        return [n for n in names if regex.search(n)]
+
+    @staticmethod
+    def _literal_prefix(pattern):
+        """
+        Literal start shared by every match of pattern, or ''.
+        >>> PropIndex._literal_prefix('^ax_.*')
+        'ax_'
+        >>> PropIndex._literal_prefix('abc')
+        ''
+        >>> PropIndex._literal_prefix('^ax|^ay') # alternation can match other starts
+        ''
+        >>> PropIndex._literal_prefix('(?i)^ax') # inline flags
+        ''
+        """
+        if not pattern.startswith('^') or '|' in pattern:
+            return ''
+        prefix = ''
+        for char in pattern[1:]:
+            if char in '.^$*+?{}[]\\|()':
+                if char in '*?{':
+                    prefix = prefix[:-1] # the last character is optional
+                break
+            prefix += char
+        return prefix
+
+PROP_INDEX = PropIndex()
+
+
 class ReportDelta:
     """
     This class is primarily meant to be used as a decorator.
@@ -163,46 +309,125 @@ class ReportDelta:
     when using from a terminal, or from within a script, use
     deltaReport = env.ReportDelta(demo.DNA)()
 
+    To watch only some prop collections (faster in large scenes), use
+    @ReportDelta(fields=['objects', 'meshes'])
+
     Primarily created for use with loadSTL, but works well with any function that changes the scene.
     To capture the state of blender environment, and compare between states, use the Props class.
     Use ReportDelta mainly as a decorator.
+
+    Only new datablocks are reported. They are found by their session_uid,
+    which increases for every datablock created in a blender session, so
+    the report does not need full snapshots of the scene.
     """
-    def __init__(self, func):
+    def __init__(self, func=None, fields=None):
         self.func = func # a function that changes something in the blender data
-        functools.update_wrapper(self, func) # to preserve original signatures
+        if func is not None:
+            functools.update_wrapper(self, func) # to preserve original signatures
 
         # find all the things to monitor
-        self.monFieldNames = PROP_FIELDS
+        self.monFieldNames = list(PROP_FIELDS if fields is None else fields)
+
+    def __call__(self, *args, **kwargs):
+        if self.func is None: # used as @ReportDelta(fields=[...])
+            return ReportDelta(args[0], self.monFieldNames)
 
         # initialize generated report
-        self.deltaReport = {
+        deltaReport = {
             'funcOut'         : [],                 # output of the function passed to this decorator
             'monitoredFields' : self.monFieldNames, # list of monitored fields in bpy.data
             'unchangedFields' : [],                 # list of fields unchanged by func
             'changedFields'   : [],                 # list of fields changed by func
         }
 
-    def __call__(self, *args, **kwargs):
         # get the 'before' state
-        propsBefore = Props().__dict__
+        uidBefore = {fieldName: self._max_uid(fieldName) for fieldName in self.monFieldNames}
+        if None in uidBefore.values(): # session_uid not available, compare snapshots
+            propsBefore = Props(fields=self.monFieldNames).__dict__
 
         # evaluate the function that is going to change blender data, and stash its output
-        self.deltaReport['funcOut'] = self.func(*args, **kwargs)
-
-        # get the 'after' state
-        propsAfter = Props().__dict__
+        deltaReport['funcOut'] = self.func(*args, **kwargs)
 
         # find all the new things
         for fieldName in self.monFieldNames:
-            thisDelta = propsAfter[fieldName] - propsBefore[fieldName]
-            if not thisDelta == set(): # only if something changed
-                self.deltaReport[fieldName] = list(thisDelta)
-                self.deltaReport['changedFields'].append(fieldName)
+            if uidBefore[fieldName] is None:
+                propsAfter = {_id_key(k): k for k in getattr(bpy.data, fieldName)}
+                thisDelta = [v for k, v in propsAfter.items() if k not in propsBefore[fieldName]]
             else:
-                self.deltaReport['unchangedFields'].append(fieldName)
+                thisDelta = self._new_since(fieldName, uidBefore[fieldName])
+            if thisDelta: # only if something changed
+                deltaReport[fieldName] = thisDelta
+                deltaReport['changedFields'].append(fieldName)
+            else:
+                deltaReport['unchangedFields'].append(fieldName)
 
         # if an object is modified, then arrange meshes and groups according to the object order?
-        return self.deltaReport
+        self.deltaReport = deltaReport # report of the last call, for callers that read it off the decorator
+        return deltaReport
+
+    @staticmethod
+    def _uids(fieldName):
+        """session_uid of every datablock in a prop collection, or None if it is not available."""
+        coll = getattr(bpy.data, fieldName)
+        uids = np.empty(len(coll), dtype=np.int32)
+        try:
+            coll.foreach_get('session_uid', uids)
+        except (AttributeError, TypeError):
+            return None
+        return uids
+
+    def _max_uid(self, fieldName):
+        uids = self._uids(fieldName)
+        if uids is None:
+            return None
+        return int(uids.max()) if uids.size else 0
+
+    def _new_since(self, fieldName, max_uid):
+        """Datablocks in a prop collection created after max_uid."""
+        coll = getattr(bpy.data, fieldName)
+        return [coll[int(i)] for i in np.flatnonzero(self._uids(fieldName) > max_uid)]
+
+
+class ChangeLog:
+    """
+    Record datablocks that the dependency graph reports as updated.
+    Cost is proportional to the number of updates, and not the size of the scene.
+    Note that the depsgraph only reports datablocks used in the current view layer.
+
+    Usage:
+        with env.ChangeLog() as log:
+            # make changes to the scene
+        log() -> {type name: list of datablocks}, e.g. {'Object': [...], 'Mesh': [...]}
+        log.ids -> list of all datablocks that were updated
+    """
+    def __init__(self):
+        self._ids = {} # {session_uid: datablock}
+
+    def _record(self, scene, depsgraph): #pylint: disable=unused-argument
+        for upd in depsgraph.updates:
+            id_data = upd.id.original
+            self._ids[_id_key(id_data)] = id_data
+
+    def __enter__(self):
+        self._ids = {}
+        bpy.app.handlers.depsgraph_update_post.append(self._record)
+        return self
+
+    def __exit__(self, *exc):
+        bpy.context.view_layer.update() # flush pending updates
+        bpy.app.handlers.depsgraph_update_post.remove(self._record)
+        return False
+
+    @property
+    def ids(self):
+        """All datablocks that were updated (and still exist)."""
+        return [v for v in self._ids.values() if _is_valid(v)]
+
+    def __call__(self):
+        ret = {}
+        for id_data in self.ids:
+            ret.setdefault(type(id_data).__name__, []).append(id_data)
+        return ret
 
 
 class Key:
@@ -278,6 +503,67 @@ class Key:
         self.end = start_frame + n_frames - 1
 
 
+class Batch(contextlib.ContextDecorator):
+    """
+    Defer view layer updates made by bpn until the end of a block.
+    Create instances with env.batch()
+
+    Setters and transforms in core (loc, rot, scl, frame, translate,
+    rotate, scale, Mesh.v, ...) call env.update, which only marks an
+    update as pending inside a batch. A single update is issued when the
+    outermost batch exits. Batches can be nested.
+
+    CAUTION: Properties that read matrix_world (e.g. loc, frame) may be
+    stale inside a batch. Use env.update(force=True) if you need them.
+
+    Usage:
+        with env.batch() as b:
+            for marker, pos in zip(markers, positions):
+                marker.loc = pos
+        b.coalesced # number of updates that were skipped
+
+        @env.batch()
+        def move_markers():
+            ...
+    """
+    depth = 0       # number of active (nested) batches
+    pending = False # an update was requested inside the active batch
+    total = 0       # number of updates coalesced in all batches so far
+
+    def __init__(self):
+        self._start = []
+        self.coalesced = 0 # number of updates coalesced by the last use of this batch
+
+    def __enter__(self):
+        Batch.depth += 1
+        self._start.append(Batch.total)
+        return self
+
+    def __exit__(self, *exc):
+        Batch.depth -= 1
+        self.coalesced = Batch.total - self._start.pop()
+        if Batch.depth == 0 and Batch.pending:
+            Batch.pending = False
+            bpy.context.view_layer.update()
+        return False
+
+def batch():
+    """Context manager (or decorator) to coalesce view layer updates. See Batch."""
+    return Batch()
+
+def update(force=False):
+    """
+    Update the view layer.
+    Inside a batch, the update is deferred until the batch exits, unless force is True.
+    """
+    if Batch.depth > 0 and not force:
+        Batch.pending = True
+        Batch.total += 1
+        return
+    Batch.pending = False
+    bpy.context.view_layer.update()
+
+
 def reset():
     """
     Reset the current scene programatically.
@@ -5,6 +5,9 @@ import os
 import errno
 import functools
 import inspect
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
 
 import numpy as np
@@ -12,10 +15,10 @@ import pandas as pd
 
 import bpy #pylint: disable=import-error
 
-from bpn import new, env, utils, core
+from bpn import new, env, utils, core, vef
 
 # File IO
-@env.ReportDelta
+@env.ReportDelta(fields=['objects', 'meshes', 'collections'])
 def loadSTL(files):
     """
     Load STL files from disk into a blender scene.
@@ -35,6 +38,43 @@ def loadSTL(files):
             raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), f)
         bpy.ops.import_mesh.stl(filepath=f)
 
+def loadMeshes(files, coll_name='Meshes', parallel=True, max_workers=None):
+    """
+    Load STL and PLY files without blender's importers.
+    Files are parsed in a process pool, and only the meshes are built on the main thread.
+    Objects and meshes are named after the files.
+
+    :param files: list. Full file paths.
+    :param coll_name: str. Blender collection name to load the meshes into.
+    :param parallel: bool. Parse files in a process pool (falls back to parsing one file at a time).
+    :returns: list of core.MeshObject
+    """
+    if isinstance(files, str):
+        files = [files]
+    for f in files:
+        if not os.path.exists(f):
+            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), f)
+
+    parsed = None
+    if parallel and len(files) > 1:
+        try:
+            # spawn fresh workers, forking blender's threads can deadlock (bpn imports without bpy)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+                parsed = list(pool.map(vef.read_mesh, files))
+        except (BrokenProcessPool, OSError):
+            print('Could not parse files in parallel. Parsing one file at a time.')
+    if parsed is None:
+        parsed = [vef.read_mesh(f) for f in files]
+
+    ret = []
+    with env.batch():
+        for fname, (v, f) in zip(files, parsed):
+            name = Path(fname).stem
+            s = core.MeshObject(utils.new_name(name), core.Mesh.from_arrays(name, v, f)())
+            s.to_coll(coll_name)
+            ret.append(s)
+    return ret
+
 @env.ReportDelta
 def load(files):
     suffix_to_import_func = {
@@ -65,10 +105,40 @@ def load(files):
         import_func = suffix_to_import_func[suffix]
         import_func(filepath=fname)
 
+def saveSTL(meshes, fPath=None, max_workers=None):
+    """
+    Export many meshes to binary STL files.
+    Coordinates and triangles are read from blender on the main thread,
+    and the files are written concurrently from a thread pool.
+
+    :param meshes: list of core.Mesh, core.MeshObject, bpy.types.Mesh or bpy.types.Object (mesh data is exported)
+    :param fPath: (str) folder to write the files (default: utils.PATH['cache']). Files are named after the meshes.
+    :param max_workers: (int) number of threads (default: ThreadPoolExecutor's default)
+    :returns: list of file names
+    :raises ValueError: if a mesh name does not give a valid file name (checked before any file is written)
+    """
+    if not isinstance(meshes, (list, tuple)):
+        meshes = [meshes]
+    jobs = []
+    for msh in meshes:
+        if isinstance(msh, bpy.types.ID):
+            msh = utils.enhance(msh)
+        if isinstance(msh, core.MeshObject):
+            msh = msh.data
+        assert isinstance(msh, core.Mesh)
+        fname = msh.export_path(fPath=fPath)
+        if fname is None:
+            raise ValueError('Invalid export file name for mesh ' + msh().name)
+        jobs.append((fname, msh.get_v(dtype=np.float32), msh.tri, msh().name))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for fut in [pool.submit(vef.write_stl, *job) for job in jobs]:
+            fut.result() # raise errors, if any
+    return [job[0] for job in jobs]
+
 def save(fname):
     bpy.ops.wm.save_mainfile(filepath=fname)
 
-@env.ReportDelta
+@env.ReportDelta(fields=['objects', 'curves', 'materials', 'collections'])
 def loadSVG(svgfile, name=None, **kwargs):
     """
     import an svg file into the blender scene.
@@ -93,7 +163,7 @@ def loadSVG(svgfile, name=None, **kwargs):
         }
     kwargs, _ = utils.clean_kwargs(kwargs, kwargs_def)
 
-    @env.ReportDelta
+    @env.ReportDelta(fields=['objects', 'curves', 'materials', 'collections'])
     def _loadSVG(files):
         """
         Import an SVG file into the blender scene.
@@ -172,17 +242,17 @@ def readattr(names, frames=1, attrs='location', fname=False, sheet_name='animati
         attrs = [attrs]
 
     # make sure names has only valid things in it
-    names = [i for i in names if env.Props()(i)]
+    names = [i for i in names if env.PROP_INDEX.get(i)]
 
     p = []
     for frame in frames:
         bpy.context.scene.frame_set(frame)
         for name in names:
-            thisProp = env.Props().get(name)[0]
+            thisProp = env.PROP_INDEX.get(name)[0]
             if isinstance(thisProp, bpy.types.Collection):
                 all_objects = bpy.data.collections[name].all_objects
             elif isinstance(thisProp, bpy.types.Object):
-                all_objects = env.Props().get_children(name)
+                all_objects = env.PROP_INDEX.get_children(name)
 
             all_objects = [o for o in all_objects if o.type == 'MESH']
             for obj in all_objects:
@@ -226,7 +296,7 @@ def animate_simple(anim_data, columns=None, propfunc=None):
         bpn.io.animate_simple(fname)
     """
     def get_obj_list(obj_name):
-        prop_list = env.Props().get(obj_name) 
+        prop_list = env.PROP_INDEX.get(obj_name)
         if len(prop_list) > 1: # multiple props detected, only keep objects
             prop_list = [o for o in prop_list if isinstance(o, bpy.types.Object)]
         return prop_list
@@ -242,6 +312,7 @@ def animate_simple(anim_data, columns=None, propfunc=None):
             anim_data = pd.read_excel(anim_data, sheet_name='animation')
 
     assert isinstance(anim_data, pd.DataFrame)
+    keys = {} # (object, attribute) : (frames, values)
     for i in np.arange(0, len(anim_data)):
         this_obj_name = anim_data.iloc[i][columns[0]] # columns[0] = 'object'
         prop_list = get_obj_list(this_obj_name)
@@ -265,9 +336,19 @@ def animate_simple(anim_data, columns=None, propfunc=None):
         val = anim_data.iloc[i][columns[3]]   # columns[3] = 'value'
         if isinstance(val, str):
             val = eval(val) # pylint: disable=eval-used
+        this_frames, this_vals = keys.setdefault((obj, attr), ([], []))
+        this_frames.append(frame)
+        this_vals.append(val)
+
+    # write all keyframes of each attribute in one go
+    for (obj, attr), (frames, vals) in keys.items():
+        core.keyframe_insert_bulk(obj, attr, frames, vals)
+
+    # leave the scene as keying row by row did: at the last keyed frame, with the last values set
+    if keys:
         bpy.context.scene.frame_set(frame)
-        setattr(obj, attr, val)
-        obj.keyframe_insert(data_path=attr, frame=frame)
+        for (obj, attr), (frames, vals) in keys.items():
+            setattr(obj, attr, vals[-1])
 
 def render(fname='', out_type='vid', fpath=None):
     """
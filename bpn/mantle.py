@@ -19,9 +19,10 @@ They are some derivates of the CompoundObject class in core.
 import coordframe as cf
 import numpy as np
 
+import bpy #pylint: disable=import-error
 import pysampled
 
-from bpn import core, utils
+from bpn import core, env, utils
 
 class Pencil(core.GreasePencilObject):
     """
@@ -94,6 +95,7 @@ class Screen(Pencil):
         self._plot_color_idx = 0
         self._ncolors = kwargs.pop('ncolors', None)
         self._color = kwargs.pop('color', {'black': (0.0, 0.0, 0.0, 1.0)})
+        self.plot_data = [] # store data from each plot
         super().__init__(name, **{**{'layer_name':'ax'}, **kwargs})
         self.draw()
     
@@ -105,6 +107,8 @@ class Screen(Pencil):
     def width(self, w):
         s = self.scl
         self.scl = (w/self._width, s[1], s[2])
+        if any(this_plot['data'].decimate is not None for this_plot in self.plot_data):
+            self.refresh() # keep the point density of decimated plots
     
     @property
     def height(self):
@@ -131,7 +135,7 @@ class Screen(Pencil):
         self.draw_axes()
 
     def draw_axes(self, **kwargs):
-        """Draw a rectangular box. Re-draws strokes every time!"""
+        """Draw a rectangular box. Re-uses the box stroke if it exists."""
         screen_points = cf.PointCloud(self.loc + np.vstack((
             [0, 0, 0],
             [self._width, 0, 0],
@@ -140,10 +144,16 @@ class Screen(Pencil):
             [0, 0, 0]
         )), self.frame)
         ax_defaults = {'layer': 'ax', 'color':'black', 'keyframe':0, 'pressure':1.5, 'strength':1.0}   
-        return super().stroke(screen_points, **{**ax_defaults, **kwargs})
+        return _restroke(self, '_ax_stroke_key', screen_points, {**ax_defaults, **kwargs})
 
     def plot(self, arg1, arg2=None, **kwargs):
-        """(x, y) plot"""
+        """
+        (x, y) plot
+        kwargs:
+            decimate ('minmax', 'lttb') draw fewer points for long signals, see utils.decimate
+            density (float) number of points per unit width when decimating
+            Full resolution data is kept in plot_data, use refresh to re-draw.
+        """
         # Not yet sure if this is a good idea, why not just use the for loop in the calling function?
         if arg2 is None and isinstance(arg1, (list, tuple)):
             ret = []
@@ -179,11 +189,25 @@ class Screen(Pencil):
                 ret.append(self.plot(x, y[:, col_count], **kwargs))
             return ret
             
-        x_plt = utils.scale_data(x, self._xlim, clip=True)*self._width
-        y_plt = utils.scale_data(y, self._ylim, clip=True)*self._height
-        pc = cf.PointCloud(np.vstack((x_plt, y_plt, np.zeros_like(x_plt))).T, self.frame)
+        this_plot_data = PlotData(x, self._xlim, self._width, y, self._ylim, self._height, decimate=kwargs.pop('decimate', None), density=kwargs.pop('density', PlotData.density))
+        this_plot_data.scale = self.scl[0]
+        pc = cf.PointCloud(this_plot_data.co, self.frame)
         plot_defaults = {'layer':'plot', 'color':self.current_color, 'keyframe':0, 'pressure':1.0, 'strength':1.0}
-        return self.stroke(pc, **{**plot_defaults, **kwargs})
+        final_kwargs = {**plot_defaults, **kwargs}
+        stroke = self.stroke(pc, **final_kwargs)
+        self.plot_data.append({'params': final_kwargs, 'stroke': stroke, 'data': this_plot_data, 'ax': self})
+        return stroke
+
+    def refresh(self, xlim=None, ylim=None, decimate=False, density=None):
+        """
+        Re-draw all plots from the full resolution data in plot_data, e.g. to zoom.
+        See Space.refresh.
+        """
+        if xlim is not None:
+            self._xlim = xlim
+        if ylim is not None:
+            self._ylim = ylim
+        _redraw_plots(self, decimate, density)
 
 class Space(Pencil):
     """
@@ -249,13 +273,14 @@ class Space(Pencil):
         return current_color
 
     def draw(self):
-        """Primary function to re-draw the plot."""
+        """Primary function to re-draw the plot. Existing strokes are re-used."""
         # Similar to your update_plots strategy in MATLAB GUIs
         if self._show_axes:
             self.draw_axes()
+        self.refresh()
 
     def draw_axes(self, **kwargs):
-        """Draw a cube. Re-draws strokes every time!"""
+        """Draw a cube. Re-uses the cube stroke if it exists."""
         screen_points = cf.PointCloud(self.loc + np.vstack((
             [0, 0, 0],
             [self._width, 0, 0],
@@ -282,7 +307,7 @@ class Space(Pencil):
             [0, self._height, self._depth],
         )), self.frame)
         ax_defaults = {'layer': 'ax', 'color':'black', 'keyframe':0, 'pressure':1.5, 'strength':1.0}   
-        return super().stroke(screen_points, **{**ax_defaults, **kwargs})
+        return _restroke(self, '_ax_stroke_key', screen_points, {**ax_defaults, **kwargs})
 
     def plot(self, arg1, arg2=None, arg3=None, **kwargs):
         """
@@ -295,6 +320,10 @@ class Space(Pencil):
             plot(d:pysampled.Data) # x will be time d.t and y will be d()
             plot(y) # x will be similar to list(range(len(y)))
             plot(list_or_tuple) # this can be a list of tuple of pysampled.Data, or numpu arrays, and it will be called recursively
+        kwargs (2D plots):
+            decimate ('minmax', 'lttb') draw fewer points for long signals, see utils.decimate
+            density (float) number of points per unit width when decimating
+            Full resolution data is kept in plot_data, use refresh to re-draw.
         """
         if self.type == '3D':
             if arg2 is None:
@@ -347,23 +376,20 @@ class Space(Pencil):
             self._xlim = (np.min(x), np.max(x))
         if self._ylim is None:
             self._ylim = (np.min(y), np.max(y))
+        decimate = kwargs.pop('decimate', None)
+        density = kwargs.pop('density', PlotData.density)
         
-        x_plt = utils.scale_data(x, self._xlim, clip=True)*self._width
-        y_plt = utils.scale_data(y, self._ylim, clip=True)*self._height
         if self.type == '2D':
-            z_plt = z
+            this_plot_data = PlotData(x, self._xlim, self._width, y, self._ylim, self._height, decimate=decimate, density=density)
         else:
             if self._zlim is None:
                 self._zlim = (np.min(z), np.max(z))
-            z_plt = utils.scale_data(z, self._zlim, clip=True)*self._depth
-        pc = cf.PointCloud(np.vstack((x_plt, y_plt, z_plt)).T, self.frame)
+            this_plot_data = PlotData(x, self._xlim, self._width, y, self._ylim, self._height, z, self._zlim, self._depth)
+        this_plot_data.scale = self.scl[0]
+        pc = cf.PointCloud(this_plot_data.co, self.frame)
         plot_defaults = {'layer':'plot', 'color':self.current_color, 'keyframe':0, 'pressure':1.0, 'strength':1.0}
         final_kwargs = {**plot_defaults, **kwargs}
         stroke = self.stroke(pc, **final_kwargs)
-        if self.type == '2D':
-            this_plot_data = PlotData(x, self._xlim, self._width, y, self._ylim, self._height)
-        else:
-            this_plot_data = PlotData(x, self._xlim, self._width, y, self._ylim, self._height, z, self._zlim, self._depth)
         ret = {
             'params': final_kwargs,
             'stroke': stroke,
@@ -374,11 +400,513 @@ class Space(Pencil):
         self.plot_data.append(ret)
         return ret
 
+    def refresh(self, xlim=None, ylim=None, zlim=None, decimate=False, density=None):
+        """
+        Re-draw all plots from the full resolution data in plot_data, e.g. to zoom.
+        Decimated 2D plots only use samples within xlim.
+        :param decimate: ('minmax', 'lttb', None) change the decimation method (default: keep)
+        :param density: (float) change the number of points per unit width (default: keep)
+        """
+        if xlim is not None:
+            self._xlim = xlim
+        if ylim is not None:
+            self._ylim = ylim
+        if zlim is not None:
+            self._zlim = zlim
+        _redraw_plots(self, decimate, density)
+
+    def line(self, arg1, arg2=None, arg3=None, autoscale=True, **kwargs):
+        """
+        Plot one line and return a handle (Line) to update it in place.
+        Takes the same inputs as plot.
+        :param autoscale: (bool) expand the axis limits when new data goes beyond them
+        Example:
+            f, ax = new.figure()
+            h = ax.line(t[:2], y[:2])
+            for i in range(2, len(t)):
+                h.append(t[i], y[i])
+        """
+        this_plot = self.plot(arg1, arg2, arg3, **kwargs)
+        assert isinstance(this_plot, dict) # one line at a time
+        return Line(self, this_plot, autoscale)
+
+    def _expand_lim(self, x, y, z=None):
+        """Expand axis limits to include new data. Returns True if any limit changed."""
+        changed = False
+        for lim_name, d in (('_xlim', x), ('_ylim', y), ('_zlim', z)):
+            if d is None or np.size(d) == 0:
+                continue
+            lim = getattr(self, lim_name)
+            d_min, d_max = np.nanmin(d), np.nanmax(d)
+            if lim is None or d_min < lim[0] or d_max > lim[1]:
+                setattr(self, lim_name, (d_min, d_max) if lim is None else (min(lim[0], d_min), max(lim[1], d_max)))
+                changed = True
+        return changed
+
+
+class Line:
+    """
+    Handle to one line in a Space. Changes re-write the line's stroke in place.
+    Returned by Space.line.
+    """
+    def __init__(self, ax, this_plot, autoscale=True):
+        self.ax = ax
+        self.plot = this_plot # entry in ax.plot_data
+        self.autoscale = autoscale
+
+    @property
+    def data(self):
+        """PlotData with the full resolution data"""
+        return self.plot['data']
+
+    @property
+    def stroke(self):
+        """core.Stroke of this line"""
+        return core.Stroke(self.plot['stroke'])
+
+    def draw(self):
+        """Re-write the points of the stroke."""
+        stroke = self.stroke
+        stroke.v = self.data.co
+        self.plot['stroke'] = stroke() # replaced when the number of points goes down
+
+    def _update(self, x, y, z):
+        """Re-draw everything if the limits changed, otherwise only this line."""
+        if self.autoscale and self.ax._expand_lim(x, y, z if self.data.depth is not None else None): #pylint: disable=protected-access
+            self.ax.refresh()
+        else:
+            self.draw()
+
+    def set_data(self, x, y, z=None):
+        """Replace the data of this line."""
+        pdata = self.data
+        pdata.x = np.asarray(x, dtype=float)
+        pdata.y = np.asarray(y, dtype=float)
+        assert len(pdata.x) == len(pdata.y)
+        if z is not None:
+            pdata.z = np.asarray(z, dtype=float)
+        self._update(pdata.x, pdata.y, z)
+
+    def append(self, x, y, z=None):
+        """Add samples to the end of this line."""
+        pdata = self.data
+        x, y = np.atleast_1d(np.asarray(x, dtype=float)), np.atleast_1d(np.asarray(y, dtype=float))
+        pdata.x = np.concatenate((pdata.x, x))
+        pdata.y = np.concatenate((pdata.y, y))
+        if z is not None:
+            z = np.atleast_1d(np.asarray(z, dtype=float))
+            pdata.z = np.concatenate((pdata.z, z))
+        self._update(x, y, z)
+
+
+def _redraw_plots(ax, decimate=False, density=None):
+    """Re-write the strokes in ax.plot_data with the current limits and object scale."""
+    for this_plot in ax.plot_data:
+        pdata = this_plot['data']
+        pdata.xlim, pdata.ylim = ax._xlim, ax._ylim #pylint: disable=protected-access
+        if pdata.depth is not None:
+            pdata.zlim = ax._zlim #pylint: disable=protected-access
+        pdata.scale = ax.scl[0]
+        if decimate is not False:
+            pdata.decimate = decimate
+        if density is not None:
+            pdata.density = density
+        stroke = core.Stroke(this_plot['stroke'])
+        stroke.v = pdata.co
+        this_plot['stroke'] = stroke() # replaced when the number of points goes down
+
+def _restroke(pencil, key_attr, ptcloud, kwargs):
+    """
+    Re-write the stroke whose (layer, keyframe, index) is stored in
+    pencil.key_attr if it still exists, otherwise make it.
+    Makes draw calls repeatable.
+    """
+    key = getattr(pencil, key_attr, None)
+    gp_stroke = None if key is None else pencil.data.get_stroke(key[2], key[1], key[0])
+    if gp_stroke is None:
+        gp_stroke = pencil.stroke(ptcloud, **kwargs)
+        setattr(pencil, key_attr, pencil.data.stroke_key(gp_stroke))
+    else:
+        stroke = core.Stroke(gp_stroke)
+        stroke.v = ptcloud.in_frame(pencil.frame).co
+        if stroke() != gp_stroke: # replaced when the number of points goes down
+            gp_stroke = stroke()
+            setattr(pencil, key_attr, pencil.data.stroke_key(gp_stroke))
+    return gp_stroke
+
+class Trail(Pencil):
+    """
+    Moving window of a trajectory (e.g. the last 2 s of a marker), drawn with one stroke.
+    The trajectory is stored once, and a frame change handler rewrites
+    the points of that stroke. Memory does not grow with the length of
+    the animation.
+
+    Example:
+        tr = mantle.Trail('wrist', pos, window_pre=2., data_rate=180, data_start=600.)
+        tr.animate_clear() # stop following the animation
+    """
+    def __new__(cls, name, *args, **kwargs): # pylint:disable=arguments-differ
+        return super().__new__(cls, name)
+
+    def __init__(self, name, points, window_pre=1., window_post=0., data_rate=1., fps=None, data_start=0., frame_start=None, line_width=40, **kwargs): # pylint:disable=arguments-differ
+        """
+        :param points: (array) nSamples x 3 trajectory in world coordinates
+        :param window_pre: (float) duration (s) of the trail before the current time
+        :param window_post: (float) duration (s) of the trail after the current time
+        :param data_rate: (float) sampling rate (Hz) of points
+        :param fps: (float) animation frame rate (default: scene frame rate)
+        :param data_start: (float) time (s) in the data shown at frame_start
+        :param frame_start: (int) default: scene start frame
+        kwargs are passed to Pencil (e.g. color, layer_name, coll_name)
+        """
+        super().__init__(name, **kwargs)
+        self.data_rate = data_rate
+        self.fps = env.Key().fps if fps is None else fps
+        self.data_start = data_start
+        self.frame_start = env.Key().start if frame_start is None else frame_start
+        self.n_pre = int(np.round(window_pre*data_rate))
+        self.n_post = int(np.round(window_post*data_rate))
+        assert self.n_pre + self.n_post >= 2
+
+        tfmat = np.linalg.inv(np.array(self().matrix_world)) # world -> object, once
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        self.points = np.ascontiguousarray(points @ tfmat[:3, :3].T + tfmat[:3, 3], dtype=np.float32)
+
+        self.animate_clear()
+        self.data.keyframe_clear()
+        self.stroke(cf.PointCloud(np.zeros((self.n_pre + self.n_post, 3))), line_width=line_width)
+        self._trail_key = (self.data.layer.info, self.data.keyframe.frame_number)
+
+        def trail_handler(scene):
+            self.show(scene.frame_current)
+        trail_handler.__doc__ = self.name # so we know which object the handler belongs to
+        bpy.app.handlers.frame_change_pre.append(trail_handler)
+        self.show(bpy.context.scene.frame_current)
+
+    def show(self, frame):
+        """Show the window of the trajectory at an animation frame."""
+        center = int(np.round((self.data_start + (frame - self.frame_start)/self.fps)*self.data_rate))
+        idx = np.clip(np.arange(center - self.n_pre, center + self.n_post), 0, len(self.points)-1)
+        layer_name, keynum = self._trail_key
+        gp_stroke = self.data.get_stroke(0, keynum, layer_name)
+        gp_stroke.points.foreach_set('co', self.points[idx].reshape(-1))
+        self().data.update_tag()
+
+    def animate_clear(self):
+        """Remove the frame change handler of this trail."""
+        for hdl in [h for h in bpy.app.handlers.frame_change_pre if h.__doc__ == self.name]:
+            bpy.app.handlers.frame_change_pre.remove(hdl)
+
+
+class Instances(core.MeshObject):
+    """
+    Draw many copies of a prototype object with one object.
+    A point cloud mesh carries the position, and per-point attributes
+    'scale', 'rotation' (euler angles in radians) and 'color'. A
+    geometry nodes modifier instances the prototype on every point.
+    Read and write them with points, scales, rotations and colors.
+    Use new.instances to create one.
+
+    All attributes can be set from numpy arrays, e.g. in every frame.
+    Example:
+        m = new.instances(np.random.rand(1000, 3), proto='sphere', r=0.02)
+        m.colors = np.random.rand(1000, 3)
+        m.points = m.points + 0.1
+        m.animate(frames, pos) # pos is nFrames x N x 3
+    """
+    modifier_name = 'bpn_instances'
+    anim_prefix = 'bpn_anim_' # custom properties of the point cloud mesh with the arrays of animate
+
+    def __new__(cls, name, *args, **kwargs): # pylint:disable=arguments-differ
+        return super().__new__(cls, name)
+
+    def __init__(self, name, points=None, proto=None, scale=None, rotation=None, color=None, coll_name='Collection'): # pylint:disable=arguments-differ
+        if bpy.data.objects.get(name) is None:
+            assert points is not None
+            msh = core.Mesh.from_arrays(name+'_pts', points)
+            super().__init__(name, msh())
+            self.to_coll(coll_name)
+            self._make_nodes()
+            self.scales = 1. if scale is None else scale
+            self.rotations = 0. if rotation is None else rotation
+        else:
+            super().__init__(name)
+            if points is not None:
+                self.points = points
+            if scale is not None:
+                self.scales = scale
+            if rotation is not None:
+                self.rotations = rotation
+        if proto is not None:
+            self.proto = proto
+        if color is not None:
+            self.colors = color
+
+    def __len__(self):
+        return len(self().data.vertices)
+
+    @property
+    def node_group(self):
+        """Geometry node tree of the instancing modifier."""
+        return self().modifiers[self.modifier_name].node_group
+
+    def _make_nodes(self):
+        """Points -> instance on points (proto, scale, rotation) -> output"""
+        ng = bpy.data.node_groups.new(self.name+'_instances', 'GeometryNodeTree')
+        if hasattr(ng, 'interface'): # blender 4
+            ng.interface.new_socket(name='Geometry', in_out='INPUT', socket_type='NodeSocketGeometry')
+            ng.interface.new_socket(name='Geometry', in_out='OUTPUT', socket_type='NodeSocketGeometry')
+        else:
+            ng.inputs.new('NodeSocketGeometry', 'Geometry')
+            ng.outputs.new('NodeSocketGeometry', 'Geometry')
+        nodes = ng.nodes
+        grp_in = nodes.new('NodeGroupInput')
+        grp_out = nodes.new('NodeGroupOutput')
+        proto = nodes.new('GeometryNodeObjectInfo')
+        proto.name = 'proto'
+        inst = nodes.new('GeometryNodeInstanceOnPoints')
+        inst.name = 'instance'
+        ng.links.new(grp_in.outputs['Geometry'], inst.inputs['Points'])
+        ng.links.new(proto.outputs['Geometry'], inst.inputs['Instance'])
+        for attr_name, sock_name in (('scale', 'Scale'), ('rotation', 'Rotation')):
+            attr = nodes.new('GeometryNodeInputNamedAttribute')
+            attr.data_type = 'FLOAT_VECTOR'
+            attr.inputs['Name'].default_value = attr_name
+            ng.links.new(next(s for s in attr.outputs if s.enabled), inst.inputs[sock_name])
+        ng.links.new(inst.outputs['Instances'], grp_out.inputs['Geometry'])
+        for x, node in enumerate((grp_in, proto, inst, grp_out)):
+            node.location = (x*200, 0)
+        mod = self().modifiers.new(self.modifier_name, 'NODES')
+        mod.node_group = ng
+
+    @property
+    def proto(self):
+        """Prototype object placed on every point."""
+        obj = self.node_group.nodes['proto'].inputs['Object'].default_value
+        return None if obj is None else utils.enhance(obj)
+
+    @proto.setter
+    def proto(self, obj):
+        if isinstance(obj, str):
+            obj = bpy.data.objects[obj]
+        if isinstance(obj, core.Thing):
+            obj = obj()
+        self.node_group.nodes['proto'].inputs['Object'].default_value = obj
+
+    def _get_attribute(self, attr_name, width):
+        attr = self().data.attributes.get(attr_name)
+        if attr is None:
+            return None
+        ret = np.empty(len(self)*width, dtype=np.float32)
+        attr.data.foreach_get('color' if width == 4 else 'vector', ret)
+        return ret.reshape(-1, width)
+
+    def _set_attribute(self, attr_name, values, width):
+        """Write a per-point attribute. values are broadcast to nPoints x width."""
+        n = len(self)
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 1 and len(values) == n and n != width: # one value per point
+            values = values[:, np.newaxis]
+        values = np.ascontiguousarray(np.broadcast_to(values, (n, width)))
+        msh = self().data
+        attr = msh.attributes.get(attr_name)
+        if attr is None:
+            attr = msh.attributes.new(attr_name, 'FLOAT_COLOR' if width == 4 else 'FLOAT_VECTOR', 'POINT')
+        attr.data.foreach_set('color' if width == 4 else 'vector', values.reshape(-1))
+        msh.update()
+
+    @property
+    def points(self):
+        """Positions of instances (nPoints x 3)."""
+        return self.data.get_v()
+
+    @points.setter
+    def points(self, co):
+        """Changing the number of points resets scale, rotation and color."""
+        co = np.asarray(co).reshape(-1, 3)
+        if len(co) == len(self):
+            self.data.set_v(co, record=False)
+            return
+        has_color = self().data.attributes.get('color') is not None
+        self().data.clear_geometry()
+        self.data.fill(co)
+        self.scales = 1.
+        self.rotations = 0.
+        if has_color:
+            self.colors = (1., 1., 1., 1.)
+
+    @property
+    def scales(self):
+        """Scale of each instance (nPoints x 3). Set with a scalar, one value per point, or nPoints x 3."""
+        return self._get_attribute('scale', 3)
+
+    @scales.setter
+    def scales(self, val):
+        self._set_attribute('scale', val, 3)
+
+    @property
+    def rotations(self):
+        """Euler angles (radians) of each instance (nPoints x 3)."""
+        return self._get_attribute('rotation', 3)
+
+    @rotations.setter
+    def rotations(self, val):
+        self._set_attribute('rotation', val, 3)
+
+    @property
+    def colors(self):
+        """RGBA color of each instance (nPoints x 4)."""
+        return self._get_attribute('color', 4)
+
+    @colors.setter
+    def colors(self, val):
+        """Set with one color or nPoints x 3 (RGB) or nPoints x 4 (RGBA)."""
+        val = np.asarray(val, dtype=np.float32)
+        if val.shape[-1] == 3:
+            val = np.concatenate((val, np.ones(val.shape[:-1]+(1,), dtype=np.float32)), axis=-1)
+        self._set_attribute('color', val, 4)
+        self._use_color()
+
+    def _use_color(self):
+        """Material of instances reads the color attribute from the points."""
+        ng = self.node_group
+        if ng.nodes.get('material') is not None:
+            return
+        mtrl = bpy.data.materials.new(self.name+'_color')
+        mtrl.use_nodes = True
+        attr = mtrl.node_tree.nodes.new('ShaderNodeAttribute')
+        attr.attribute_type = 'INSTANCER'
+        attr.attribute_name = 'color'
+        bsdf = mtrl.node_tree.nodes['Principled BSDF']
+        mtrl.node_tree.links.new(attr.outputs['Color'], bsdf.inputs['Base Color'])
+
+        set_mtrl = ng.nodes.new('GeometryNodeSetMaterial')
+        set_mtrl.name = 'material'
+        set_mtrl.inputs['Material'].default_value = mtrl
+        proto, inst = ng.nodes['proto'], ng.nodes['instance']
+        set_mtrl.location = (proto.location[0]+100, proto.location[1]-200)
+        ng.links.new(proto.outputs['Geometry'], set_mtrl.inputs['Geometry'])
+        ng.links.new(set_mtrl.outputs['Geometry'], inst.inputs['Instance'])
+
+    def animate(self, frames, points=None, scales=None, rotations=None, colors=None):
+        """
+        Set attributes in every frame from arrays that are stored once.
+        Each input is an nFrames x nPoints x width array (see the setters).
+        Between the listed frames, the previous frame is held.
+
+        The arrays are saved as custom properties of the point cloud mesh
+        (see anim_prefix), and a frame change handler in this module
+        writes the attributes of the current frame. The animation is read
+        back when a .blend file is loaded, as long as bpn.mantle is
+        imported, e.g. blender -b file.blend --python-expr "import bpn.mantle" -a
+        Remove with animate_clear.
+        """
+        frames = np.asarray(frames, dtype=float)
+        data = {k: self._frames_array(k, v, len(frames)) for k, v in (('points', points), ('scales', scales), ('rotations', rotations), ('colors', colors)) if v is not None}
+        self.animate_clear()
+        msh = self().data
+        msh[self.anim_prefix+'frames'] = frames.tolist()
+        for attr_name, val in data.items():
+            msh[self.anim_prefix+attr_name] = val.ravel().tolist()
+        _ANIMATED[self.name] = (self, frames, data)
+        _instances_frame(self, frames, data, bpy.context.scene.frame_current)
+        return self
+
+    def _frames_array(self, attr_name, val, n_frames):
+        """Broadcast the animation of one attribute to nFrames x nPoints x width, as the setters do."""
+        val = np.asarray(val, dtype=np.float32)
+        width = 4 if attr_name == 'colors' else 3
+        if attr_name == 'colors' and val.ndim > 1 and val.shape[-1] == 3: # RGB
+            val = np.concatenate((val, np.ones(val.shape[:-1]+(1,), dtype=np.float32)), axis=-1)
+        assert len(val) == n_frames
+        if val.ndim == 1: # one value per frame
+            val = val[:, np.newaxis, np.newaxis]
+        elif val.ndim == 2: # one value per point, or one vector for all points, as in _set_attribute
+            val = val[:, :, np.newaxis] if val.shape[1] == len(self) and len(self) != width else val[:, np.newaxis, :]
+        return np.ascontiguousarray(np.broadcast_to(val, (n_frames, len(self), width)))
+
+    def _load_animation(self):
+        """Read the animation saved by animate from the point cloud mesh."""
+        msh = self().data
+        frames = np.asarray(msh[self.anim_prefix+'frames'].to_list(), dtype=float)
+        data = {}
+        for attr_name in ('points', 'scales', 'rotations', 'colors'):
+            if self.anim_prefix+attr_name in msh:
+                val = np.asarray(msh[self.anim_prefix+attr_name].to_list(), dtype=np.float32)
+                data[attr_name] = val.reshape(len(frames), len(self), -1)
+        _ANIMATED[self.name] = (self, frames, data)
+
+    def animate_clear(self):
+        """Stop the animation, and remove the arrays saved by animate."""
+        _ANIMATED.pop(self.name, None)
+        msh = self().data
+        for key in [k for k in msh.keys() if k.startswith(self.anim_prefix)]:
+            del msh[key]
+
+_ANIMATED = {} # object name -> (Instances, frames, {attribute name: nFrames x nPoints x width}), see Instances.animate
+
+def _instances_frame(inst, frames, data, frame):
+    """Write the attributes of the last listed frame at or before frame."""
+    idx = max(np.searchsorted(frames, frame, side='right') - 1, 0)
+    for attr_name, val in data.items():
+        setattr(inst, attr_name, val[idx])
+
+@bpy.app.handlers.persistent
+def _animate_instances(scene, *args): #pylint: disable=unused-argument
+    for name, (inst, frames, data) in list(_ANIMATED.items()):
+        if bpy.data.objects.get(name) is None:
+            del _ANIMATED[name]
+            continue
+        _instances_frame(inst, frames, data, scene.frame_current)
+
+@bpy.app.handlers.persistent
+def _load_instances_animation(*args): #pylint: disable=unused-argument
+    """Read the animation of Instances from a .blend file that was loaded."""
+    _ANIMATED.clear()
+    for obj in bpy.data.objects:
+        if obj.type == 'MESH' and obj.modifiers.get(Instances.modifier_name) is not None and Instances.anim_prefix+'frames' in obj.data:
+            Instances(obj.name)._load_animation() #pylint: disable=protected-access
+
+for _hdl_list, _hdl_func in ((bpy.app.handlers.frame_change_pre, _animate_instances), (bpy.app.handlers.load_post, _load_instances_animation)):
+    for _hdl in [h for h in _hdl_list if getattr(h, '__name__', '') == _hdl_func.__name__]:
+        _hdl_list.remove(_hdl) # in case the module is reloaded
+    _hdl_list.append(_hdl_func)
+
 class PlotData:
-    def __init__(self, x, xlim, width, y, ylim, height, z=None, zlim=None, depth=None) -> None:
+    """
+    Full resolution data of a plot, and how it is drawn.
+    2D plots can be decimated (see utils.decimate) to draw about density*width points.
+    """
+    density = 50. # default number of points per unit width when decimating
+    scale = 1. # object scale along x, drawn width is width*scale
+
+    def __init__(self, x, xlim, width, y, ylim, height, z=None, zlim=None, depth=None, decimate=None, density=None) -> None:
         self.x, self.y, self.z = x, y, z
         self.xlim, self.ylim, self.zlim = xlim, ylim, zlim
         self.width, self.height, self.depth = width, height, depth
+        self.decimate = decimate
+        if density is not None:
+            self.density = density
+
+    @property
+    def idx(self):
+        """Indices of the samples that are drawn."""
+        if self.decimate is None or self.depth is not None:
+            return np.arange(len(self.x))
+        visible = np.flatnonzero((self.x >= self.xlim[0]) & (self.x <= self.xlim[1]))
+        return visible[utils.decimate(self.x[visible], self.y[visible], int(self.density*self.width*self.scale), self.decimate)]
+
+    @property
+    def co(self):
+        """Coordinates of the drawn points (in the plot's frame)."""
+        idx = self.idx
+        x_plt = utils.scale_data(self.x[idx], self.xlim, clip=True)*self.width
+        y_plt = utils.scale_data(self.y[idx], self.ylim, clip=True)*self.height
+        if self.depth is None:
+            z_plt = np.zeros_like(x_plt) if self.z is None else np.asarray(self.z, dtype=float)[idx]
+        else:
+            z_plt = utils.scale_data(np.asarray(self.z)[idx], self.zlim, clip=True)*self.depth
+        return np.vstack((x_plt, y_plt, z_plt)).T
     
     @property
     def x_plt(self):
@@ -22,7 +22,7 @@ def empty(name=None, typ='PLAIN_AXES', size=0.25, coll_name='Collection'):
     """
     if name is None:
         name = 'empty'
-    name = utils.new_name(name, [o.name for o in bpy.data.objects])
+    name = utils.new_name(name)
     s = core.ContainerObject(name, empty_display_type=typ, empty_display_size=size)
     s.to_coll(coll_name)
     return s
@@ -75,6 +75,7 @@ def mesh(name=None, **kwargs): # formerly bpn.Msh
                 Edges connecting vertices
         
         More generally, supply v=myVertices, e=myEdges, f=myFaces to create a mesh
+        attributes={'name': array} adds per-vertex/face/corner data to it (see mesh_from_arrays)
     
     Broadly, using this function, core.MeshObjects can be created from:
     - (type=stl) an STL file import
@@ -134,18 +135,12 @@ def mesh(name=None, **kwargs): # formerly bpn.Msh
             xyfun = kwargs['xyfun']
             assert isinstance(xyfun, types.FunctionType)
             assert xyfun.__code__.co_argcount == 2 # function has two input arguments
-            kwargs['z'] = np.array([[xyfun(xv, yv) for yv in y] for xv in x])
+            kwargs['z'] = _sample_xyfun(xyfun, x, y)
 
         if 'z' in kwargs:
             z = np.array(kwargs['z'])
             if len(np.shape(z)) == 2: # 2D array, surface plot
-                nX = len(x)
-                nY = len(y)
-                assert nX == np.shape(z)[0]
-                assert nY == np.shape(z)[1]
-                # matrix to vertices and faces
-                kwargs['v'] = [(xv, yv, z[ix][iy]) for iy, yv in enumerate(y) for ix, xv in enumerate(x)]
-                kwargs['f'] = [(iy*nX+ix, iy*nX+ix+1, (iy+1)*nX+(ix+1), (iy+1)*nX+ix) for iy in np.arange(0, nY-1) for ix in np.arange(0, nX-1)]
+                return core.Mesh.from_arrays(msh_name, *vef.grid2vef(x, y, z), attributes=kwargs.get('attributes'))()
             if len(np.shape(z)) == 1: # 3D plot!
                 kwargs['v'], kwargs['e'], _ = vef.xyz2vef(x, y, z)
 
@@ -154,12 +149,8 @@ def mesh(name=None, **kwargs): # formerly bpn.Msh
                 kwargs['e'] = []
             if 'f' not in kwargs:
                 kwargs['f'] = []
-            msh = bpy.data.meshes.new(msh_name)
-            msh.from_pydata(kwargs['v'], kwargs['e'], kwargs['f'])
-            if not kwargs['e']:
-                msh.update(calc_edges=True)
-            else:
-                msh.update()
+            calc_edges = len(kwargs['f']) > 0 # e may leave out edges of faces, as with from_pydata
+            msh = core.Mesh.from_arrays(msh_name, kwargs['v'], kwargs['f'], kwargs['e'], kwargs.get('attributes'), calc_edges)()
         return msh # blender mesh
 
     names, kwargs = utils.clean_names(name, kwargs, {'priority_msh': 'current', 'priority_obj': 'current'}, mode='msh')
@@ -169,20 +160,18 @@ def mesh(name=None, **kwargs): # formerly bpn.Msh
     if 'stl' in kwargs:
         stlfile = kwargs['stl']
         assert os.path.isfile(stlfile)
-        s = core.MeshObject(io.loadSTL([stlfile])['objects'][0])
-        s.name = obj_name
-        s.data.name = msh_name
+        s = core.MeshObject(obj_name, core.Mesh.from_arrays(msh_name, *vef.read_stl(stlfile))())
         s.to_coll(coll_name)
         return s
 
     # if obj_name exists, use object and corresponding mesh
-    if obj_name in [o.name for o in bpy.data.objects]:
+    if bpy.data.objects.get(obj_name) is not None:
         s = core.MeshObject(obj_name)
         s.to_coll(coll_name)
         return s
 
     # if mesh exists, assign it to the object, and put it in collection
-    if msh_name in [m.name for m in bpy.data.meshes]:
+    if bpy.data.meshes.get(msh_name) is not None:
         s = core.MeshObject(obj_name, bpy.data.meshes[msh_name])
         s.to_coll(coll_name)
         return s
@@ -192,6 +181,52 @@ def mesh(name=None, **kwargs): # formerly bpn.Msh
     s.to_coll(coll_name)
     return s
 
+def _sample_xyfun(xyfun, x, y, chunk_size=2**20):
+    """
+    Evaluate xyfun on the grid x (nX) by y (nY). Returns an nX x nY array.
+    Functions that work on numpy arrays are evaluated once on a meshgrid.
+    Others are evaluated point by point with np.vectorize, chunk_size points at a time.
+    """
+    xg, yg = np.meshgrid(np.asarray(x, dtype=float), np.asarray(y, dtype=float), indexing='ij')
+    try:
+        z = np.asarray(xyfun(xg, yg), dtype=float)
+        if z.shape == xg.shape:
+            return z
+        if z.ndim == 0: # constant
+            return np.full(xg.shape, float(z))
+    except (TypeError, ValueError): # e.g. math functions, or if statements on the inputs
+        pass
+    xyfun_vec = np.vectorize(xyfun, otypes=[float])
+    z = np.empty(xg.shape)
+    n_rows = max(chunk_size // max(xg.shape[1], 1), 1)
+    for start in range(0, len(xg), n_rows):
+        z[start:start+n_rows] = xyfun_vec(xg[start:start+n_rows], yg[start:start+n_rows])
+    return z
+
+def mesh_from_arrays(v, f=None, e=None, attributes=None, calc_edges=None, name=None, f_csr=None, **kwargs):
+    """
+    Create a mesh object directly from numpy arrays, using foreach_set instead of from_pydata.
+    Returns core.MeshObject
+
+    :param v: (array) nVx3 vertex coordinates
+    :param f: faces - nFx3 (triangles), nFx4 (quads), or a list of arrays with vertex indices of each face
+    :param e: (array) nEx2 vertex indices of edges
+    :param attributes: (dict) name -> array with one row per vertex, face or face corner
+        e.g. {'temperature': t, 'Col': rgba, 'UVMap': uv} (see core.Mesh.set_attribute)
+        Use name -> (array, domain) when the number of rows is ambiguous.
+    :param calc_edges: (bool) let blender make the edges of faces (default: only when e is not given)
+        Without it, e must contain every edge of every face.
+    :param f_csr: faces as (loop_start, loop_total, vertex_indices), as returned by core.Mesh.f_csr
+    kwargs: msh_name, obj_name, coll_name
+    Example:
+        s = new.mesh_from_arrays(v, f, attributes={'height': v[:, 2]}, name='terrain')
+    """
+    names, _ = utils.clean_names(name, kwargs, {'priority_msh': 'new', 'priority_obj': 'new'}, mode='msh')
+    msh = core.Mesh.from_arrays(names['msh_name'], v, f, e, attributes, calc_edges, f_csr)
+    s = core.MeshObject(names['obj_name'], msh())
+    s.to_coll(names['coll_name'])
+    return s
+
 def pencil(name=None, **kwargs):
     """
     Create a new grease pencil object.
@@ -269,48 +304,88 @@ def bezier_circle(name=None, **kwargs):
 
 
 # Primitives
-def easycreate(mshfunc, name=None, **kwargs):
+_PRIMITIVES = {} # primitive key -> mesh name
+
+def easycreate(mshfunc, name=None, shared=False, **kwargs):
     """
     **kwargs : u=16, v=8, r=0.5 for uv sphere
     **kwargs : size=0.5 for uv cube
 
+    :param shared: (bool) True to share one mesh among objects made with
+        the same primitive and parameters (unless msh_name is specified).
+        Editing a shared mesh through the object (s.v = ..., s.inflate(),
+        s.shade(), ...) gives that object its own copy first. Edits made
+        directly on the blender mesh (e.g. s().data.materials) change
+        every object sharing it.
+
     Warning: Avoid empty creates such as new.sphere()!
     """
+    explicit_msh = 'msh_name' in kwargs
     names, kwargs = utils.clean_names(name, kwargs, {'priority_obj':'new', 'priority_msh':'current'})
+    if shared and not explicit_msh:
+        msh, kwargs = _primitive_mesh(mshfunc, None, kwargs, shared=True)
+    else: # the mesh named msh_name, made if it doesn't exist
+        msh, kwargs = _primitive_mesh(mshfunc, names['msh_name'], kwargs, shared=False, reuse_name=True)
+    return mesh(msh_name=msh.name, obj_name=names['obj_name'], coll_name=names['coll_name'], pargs=kwargs)
+
+def _primitive_mesh(mshfunc, msh_name, kwargs, shared=True, reuse_name=False):
+    """
+    Get a shared mesh made with the same parameters, or make it with a
+    bmesh primitive function. See easycreate.
+    :param msh_name: (str) name of a new mesh (default: based on the primitive)
+    :param reuse_name: (bool) use the mesh named msh_name if it exists
+    Returns the blender mesh, and the cleaned keyword arguments of mshfunc.
+    """
     if int(bpy.app.version_string.split('.')[0]) == 2:
         size_param_name = 'diameter'
     else:
         size_param_name = 'radius' # API change in version 3
 
     # input control
+    prim_name = 'primitive'
     if str(mshfunc) == str(bmesh.ops.create_uvsphere):
+        prim_name = 'sphere'
         kwargs_def = {'u_segments':16, 'v_segments':8, size_param_name:0.5}
         kwargs_alias = {'u_segments': ['u', 'u_segments'], 'v_segments': ['v', 'v_segments'], size_param_name: ['r', 'radius', 'diameter']}
         kwargs, _ = utils.clean_kwargs(kwargs, kwargs_def, kwargs_alias)
 
     if str(mshfunc) == str(bmesh.ops.create_cube):
+        prim_name = 'cube'
         kwargs_def = {'size':1}
         kwargs_alias = {'size': ['size', 'sz', 's', 'r']}
         kwargs, _ = utils.clean_kwargs(kwargs, kwargs_def, kwargs_alias)
     
     if str(mshfunc) == str(bmesh.ops.create_cone):
+        prim_name = 'cone'
         kwargs_def = {'segments':12, f'{size_param_name}1':2, f'{size_param_name}2':0, 'depth':3, 'cap_ends':True, 'cap_tris':False}
         kwargs_alias = {'segments':['segments', 'seg', 'u', 'n'], f'{size_param_name}1':['diameter1', 'radius1', 'r1', 'r'], f'{size_param_name}2':['diameter2', 'radius2', 'r2'], 'depth':['depth', 'd', 'h'], 'cap_ends':['cap_ends', 'fill'], 'cap_tris':['cap_tris', 'fill_tri']}
         kwargs, _ = utils.clean_kwargs(kwargs, kwargs_def, kwargs_alias)
 
     if str(mshfunc) == str(bmesh.ops.create_monkey):
+        prim_name = 'monkey'
         kwargs = {}
 
-    if names['msh_name'] in [m.name for m in bpy.data.meshes]:
-        msh = bpy.data.meshes[names['msh_name']]
-    else:
-        msh = bpy.data.meshes.new(names['msh_name'])
-        bm = bmesh.new()
-        mshfunc(bm, **kwargs)
-        bm.to_mesh(msh)
-        bm.free()
-        msh.update()
-    return mesh(msh_name=msh.name, obj_name=names['obj_name'], coll_name=names['coll_name'], pargs=kwargs)
+    if reuse_name and bpy.data.meshes.get(msh_name) is not None:
+        return bpy.data.meshes[msh_name], kwargs
+
+    key = repr((str(mshfunc), sorted(kwargs.items()), bpy.app.version_string)) # generator, parameters, blender version
+    if shared:
+        msh = bpy.data.meshes.get(_PRIMITIVES.get(key, ''))
+        if msh is not None and msh.get(core.Mesh.primitive_tag) == key:
+            return msh, kwargs
+
+    if msh_name is None:
+        msh_name = prim_name+'_msh'
+    msh = bpy.data.meshes.new(utils.new_name(msh_name, coll='meshes'))
+    bm = bmesh.new()
+    mshfunc(bm, **kwargs)
+    bm.to_mesh(msh)
+    bm.free()
+    msh.update()
+    if shared:
+        msh[core.Mesh.primitive_tag] = key
+        _PRIMITIVES[key] = msh.name
+    return msh, kwargs
 
 sphere = partial(easycreate, bmesh.ops.create_uvsphere)
 monkey = partial(easycreate, bmesh.ops.create_monkey)
@@ -318,6 +393,102 @@ cube = partial(easycreate, bmesh.ops.create_cube)
 cone = partial(easycreate, bmesh.ops.create_cone)
 polygon = partial(cone, **{'d':0, 'cap_ends':False, 'cap_tris':False, 'r1':2.2, 'r2':1.8})
 
+def objects_from_mesh(msh, n=None, names=None, matrices=None, coll_name='Collection'):
+    """
+    Create many objects that share one mesh.
+    Objects are linked to the collection directly, and their world
+    matrices are set with one view layer update.
+
+    :param msh: (core.Mesh, bpy.types.Mesh, str) mesh shared by all objects
+    :param n: (int) number of objects, when names is a base name
+    :param names: (list of str) object names, or (str) base name for n objects (default: mesh name)
+    :param matrices: (array) N x 4 x 4 world matrices, or one 4 x 4 matrix for all objects
+    :param coll_name: (str) collection name
+    Returns core.ObjectArray
+    Example:
+        a = new.objects_from_mesh(get('sph').data, 100, 'marker')
+    """
+    if isinstance(msh, str):
+        msh = bpy.data.meshes[msh]
+    if isinstance(msh, core.Thing):
+        msh = msh()
+    if names is None:
+        names = msh.name
+    reserved = []
+    if isinstance(names, str):
+        assert n is not None
+        names = reserved = utils.NAMES.reserve(names, n)
+    coll = core.Collection(coll_name)()
+    objs = []
+    for obj_name in names:
+        obj = bpy.data.objects.new(obj_name, msh)
+        coll.objects.link(obj)
+        objs.append(obj)
+    utils.NAMES.release(reserved)
+    ret = core.ObjectArray(objs)
+    if matrices is not None:
+        ret.matrix_world = np.broadcast_to(np.asarray(matrices, dtype=float), (len(ret), 4, 4))
+    return ret
+
+def spheres(names=None, locs=None, r=0.5, coll_name='Collection', msh_name=None, shared=True, n=None, **kwargs):
+    """
+    Create many spheres that share one mesh. See objects_from_mesh.
+
+    :param names: (list of str) object names, or (str) base name for len(locs) or n spheres (default: 'sphere')
+    :param locs: (array) N x 3 locations (default: origin)
+    :param n: (int) number of spheres, when neither locs nor a list of names is given
+    :param r: (float) radius
+    :param msh_name: (str) use this mesh if it exists (default: shared sphere mesh, see easycreate)
+    :param shared: (bool) False to make a new mesh
+    kwargs: u, v (number of segments) as in sphere
+    Returns core.ObjectArray
+    Example:
+        markers = new.spheres(['a', 'b', 'c'], np.random.rand(3, 3), r=0.1, coll_name='Markers')
+        markers = new.spheres('marker', n=10, r=0.1)
+    """
+    if names is None:
+        names = 'sphere'
+    if locs is not None:
+        locs = np.asarray(locs, dtype=float).reshape(-1, 3)
+    if not isinstance(names, str):
+        n = len(names)
+    elif locs is not None:
+        n = len(locs)
+    elif n is None:
+        raise ValueError('Specify the number of spheres with locs, a list of names, or n.')
+    msh, _ = _primitive_mesh(bmesh.ops.create_uvsphere, msh_name, {'r': r, **kwargs}, shared, msh_name is not None)
+    matrices = None
+    if locs is not None:
+        assert len(locs) == n
+        matrices = np.tile(np.eye(4), (n, 1, 1))
+        matrices[:, :3, 3] = locs
+    return objects_from_mesh(msh, n, names, matrices, coll_name)
+
+def instances(points, proto='sphere', scale=1., rotation=0., color=None, name=None, coll_name='Collection', **kwargs):
+    """
+    Draw a prototype at many points with one object (geometry nodes instancing).
+    Use this instead of spheres for large marker sets.
+
+    :param points: (array) N x 3 positions
+    :param proto: ('sphere', 'cube', 'cone', 'monkey') make a hidden primitive with kwargs (e.g. r=0.1)
+        (str, core.Object, bpy.types.Object) or use an existing object
+    :param scale: scalar, N values, or N x 3
+    :param rotation: (array) euler angles (radians), 3 values or N x 3
+    :param color: (array) RGB(A), one color, or N x 3 (N x 4)
+    Returns mantle.Instances
+    Example:
+        m = new.instances(pos[0], proto='sphere', r=0.3, color=(1, 0, 0))
+        m.animate(frames, pos) # pos is nFrames x N x 3
+    """
+    if name is None:
+        name = 'instances'
+    name = utils.new_name(name)
+    if proto in ('sphere', 'cube', 'cone', 'monkey'):
+        proto = {'sphere': sphere, 'cube': cube, 'cone': cone, 'monkey': monkey}[proto](name=name+'_proto', coll_name=coll_name, shared=True, **kwargs)
+        proto().hide_set(True)
+        proto().hide_render = True
+    return mantle.Instances(name, points, proto, scale, rotation, color, coll_name)
+
 def ngon(name=None, **kwargs):
     """Create a new n-sided polygon with one face inscribed in a circle of radius r."""
     kwargs_def = {'n':6, 'r':1, 'theta_offset_deg':'auto', 'fill':True}
@@ -399,7 +570,7 @@ def box(name=None, **kwargs):
             x, y, z = [(round(np.min(v[:, dim]), round_dec), round(np.max(v[:, dim]), round_dec)) for dim in (0, 1, 2)]
             return dict(x=x, y=y, z=z)
 
-    name = utils.new_name('new_box', [o.name for o in bpy.data.objects]) if name is None else name
+    name = utils.new_name('new_box') if name is None else name
     return Box(name, **kwargs)
 
 class Image:
@@ -420,7 +591,7 @@ class Image:
         p.apply_matrix()
         p.rotate((90, 0, 0)) # default plane is XZ
 
-        mtrl_name = utils.new_name('immaterial', [m.name for m in bpy.data.materials])
+        mtrl_name = utils.new_name('immaterial', coll='materials')
         mat = bpy.data.materials.new(name=mtrl_name)
         mat.use_nodes = True
         bsdf = mat.node_tree.nodes["Principled BSDF"]
@@ -599,7 +770,7 @@ class Text(core.Object):
     """
     def __init__(self, expr, name=None, **kwargs):
         if name is None:
-            name = utils.new_name('new_text', [o.name for o in bpy.data.objects])
+            name = utils.new_name('new_text')
         kwargs_names, _ = utils.clean_names(name, kwargs, {'priority_curve': 'new'}, mode='curve')
         def write_tex_file(fname):
             try:
@@ -654,7 +825,7 @@ class ObjectOnCircle(core.Object):
     def __init__(self, this_thing, coll_name, path, size, targ=None):
         super().__init__(this_thing.name.lower(), this_thing)
         self.to_coll(coll_name)
-        container_name = utils.new_name(self.name+'_container', [o.name for o in bpy.data.objects])
+        container_name = utils.new_name(self.name+'_container')
         self.container = core.ContainerObject(container_name, empty_display_type='CUBE', empty_display_size=size)
         self.container.to_coll(coll_name)
         self.container.add(self)
@@ -674,7 +845,7 @@ class ObjectOnCircle(core.Object):
     @theta.setter
     def theta(self, new_theta):
         self.container().constraints[0].offset_factor = self.theta2offset(new_theta%(2*np.pi))
-        bpy.context.view_layer.update()
+        env.update()
 
     @property
     def center(self):
@@ -715,7 +886,7 @@ class CircularRig(core.Collection):
         return super().__new__(cls, rig_name)
 
     def __init__(self, rig_name='CircularRig', size=0.20):
-        assert not env.Props().get(rig_name)
+        assert not env.PROP_INDEX.get(rig_name)
         super().__init__(rig_name)  
         self.rig_name = rig_name
         self.size = size
@@ -797,7 +968,7 @@ class CircularRig(core.Collection):
     @fov.setter
     def fov(self, hor_angle_deg):
         self.camera().data.lens = 0.5*self.camera().data.sensor_width/np.tan(hor_angle_deg*np.pi/360)
-        bpy.context.view_layer.update()
+        env.update()
 
     def scale(self, scl_factor=1):
         """Scale the rig by scale factor in (int) scl_factor."""
@@ -805,7 +976,7 @@ class CircularRig(core.Collection):
         self.key_light.path.scale(scl_factor)
         self.fill_light.path.scale(scl_factor)
         self.back_light.path.scale(scl_factor)
-        bpy.context.view_layer.update()
+        env.update()
 
     def key(self, frame=None, targ='lens', value=None):
         """Camera and target keyframe insertion."""
@@ -78,18 +78,18 @@ def get(name=None, mode=None, priority='Object'):
         regex = re.compile('[.^$*+}{|)(]')
         if isinstance(name, str):
             if regex.search(name) is not None: # not a normal string
-                name = env.Props().search(name)
+                name = env.PROP_INDEX.search(name)
                 regex_flag = True
 
         if isinstance(name, list): # if name is a list of regular expressions
             checked_name = []
             for this_name in name:
                 if regex.search(this_name) is not None:
-                    checked_name += env.Props().search(this_name)
+                    checked_name += env.PROP_INDEX.search(this_name)
                     regex_flag = True
                 else:
                     checked_name += [this_name]
-            name = list(np.unique(checked_name))
+            name = sorted(set(checked_name))
             name = [n for n in name if '/' not in n]
             if len(name) == 1:
                 name = name[0]
@@ -97,7 +97,7 @@ def get(name=None, mode=None, priority='Object'):
     
     def _get_one_with_name(name):
         """Returns one dispatched object."""
-        all_items = env.Props().get(name)
+        all_items = env.PROP_INDEX.get(name)
         if all_items: # at least one item found
             all_obj_items = [item for item in all_items if type(item).__name__ == priority]
             if all_obj_items: # one of the items was object item
@@ -109,11 +109,11 @@ def get(name=None, mode=None, priority='Object'):
     def _get_all_with_name(name):
         """Returns a list of dispatched objects (even if there is only one)."""
         assert isinstance(name, str)
-        return [enhance(item) for item in env.Props().get(name) if enhance(item)]
+        return [enhance(item) for item in env.PROP_INDEX.get(name) if enhance(item)]
 
     def _dispatcher(name, mode):
         if mode is None and name is None: # no inputs given, return the last object
-            return _get_one_with_name([o.name for o in bpy.data.objects][-1])
+            return _get_one_with_name(bpy.data.objects[-1].name)
         if mode is None and isinstance(name, str): # return one object
             return _get_one_with_name(name)
         if mode is None and isinstance(name, list):
@@ -128,7 +128,7 @@ def get(name=None, mode=None, priority='Object'):
         return [] # In theory, this statement should never be reached
     
     if isinstance(name, str) and name in env.PROP_FIELDS: # special case: return all items of a given type
-        return [enhance(t) for t in env.Props()(return_empty=True)[name]]
+        return [enhance(t) for t in getattr(bpy.data, name)]
 
     name, mode, regex_flag = _input_check(name, mode)
     ret_list = _dispatcher(name, mode)
@@ -176,18 +176,99 @@ def enhance(item): # item is bpy.data.(sometype)
     return core.Thing(item.name, thing_type)
 
 ### Name management
-def new_name(name, curr_names=None):
+class NameAllocator:
+    """
+    Blender-style unique names for props, without scanning prop collections.
+    Use the module-level instance utils.NAMES, or utils.new_name
+
+    Existence is checked with bpy.data.<coll>.get, so renames and
+    deletions made anywhere are taken into account. The last suffix
+    handed out for each name is remembered, so that asking for the same
+    name many times (e.g. 'sphere' -> 'sphere.001', 'sphere.002', ...)
+    doesn't re-check all the taken suffixes.
+
+    Reserved names are skipped when making new names, and handed out
+    only when they are asked for exactly. So, they can be passed to bpn
+    creators (e.g. new.sphere(names[0])) or to bpy.data.<coll>.new.
+
+    Example:
+        utils.NAMES.new('sphere', 'meshes')
+        names = utils.NAMES.reserve('marker', 500) # 500 names that will not be handed out to others
+        new.sphere(names[0]) # object named names[0]
+    """
+    def __init__(self):
+        self._counters = {} # (coll, name): last suffix handed out
+        self._reserved = {} # coll: set of reserved names
+
+    def _taken(self, name, coll):
+        return getattr(bpy.data, coll).get(name) is not None or name in self._reserved.get(coll, ())
+
+    def new(self, name, coll='objects'):
+        """
+        Return name if it is not taken in bpy.data.<coll>, otherwise name.001, name.002, ...
+        A reserved name asked for exactly is handed out, and is no longer reserved.
+        """
+        reserved = self._reserved.get(coll, set())
+        if name in reserved:
+            reserved.discard(name)
+            if getattr(bpy.data, coll).get(name) is None:
+                return name
+        return self._next(name, coll)
+
+    def _next(self, name, coll):
+        """First name that is neither taken in bpy.data.<coll> nor reserved."""
+        key = (coll, name)
+        if not self._taken(name, coll):
+            self._counters.pop(key, None) # the name is free again, e.g. after reset
+            return name
+        i = self._counters.get(key, 0)
+        tmp_name = name
+        while self._taken(tmp_name, coll):
+            i += 1
+            tmp_name = name + '.{:03d}'.format(i)
+        self._counters[key] = i
+        return tmp_name
+
+    def reserve(self, name, n, coll='objects'):
+        """
+        Reserve n unique names at once, e.g. before creating many objects.
+        Reserved names are not handed out to others until they are used
+        (asked for exactly with new, or created in bpy.data), or released.
+        """
+        blend_coll = getattr(bpy.data, coll)
+        reserved = self._reserved.setdefault(coll, set())
+        reserved.difference_update([r for r in reserved if blend_coll.get(r) is not None]) # already created
+        ret = []
+        for _ in range(n):
+            ret.append(self._next(name, coll))
+            reserved.add(ret[-1])
+        return ret
+
+    def release(self, names, coll='objects'):
+        """Release reserved names."""
+        if isinstance(names, str):
+            names = [names]
+        self._reserved.get(coll, set()).difference_update(names)
+
+NAMES = NameAllocator()
+
+def new_name(name, curr_names=None, coll='objects'):
     """
     Blender-style name conflict resolution.
 
     Appends .001 if name is in curr_names
     If name+'.001' exists, then returns name+'.002' and so on
 
+    :param curr_names: (list) names to avoid. By default, names in bpy.data.<coll> are avoided (see NameAllocator).
+    :param coll: (str) prop collection, e.g. 'objects', 'meshes'
+
     Example:
-        obj_name = new_name(obj_name, [o.name for o in bpy.data.objects])
+        obj_name = new_name(obj_name)
+        msh_name = new_name(msh_name, coll='meshes')
     """
     if curr_names is None:
-        curr_names = [o.name for o in bpy.data.objects]
+        return NAMES.new(name, coll)
+    curr_names = set(curr_names)
     i = 0
     tmp_name = name
     while tmp_name in curr_names:
@@ -233,19 +314,20 @@ def clean_names(name, kwargs, kwargs_def=None, mode='msh'):
     
     # what to do if 'obj_name' and/or 'msh_name' already exist in the blender workspace
     if kwargs_names['priority_obj'] == 'new':
-        kwargs_names['obj_name'] = new_name(kwargs_names['obj_name'], [o.name for o in bpy.data.objects])
+        kwargs_names['obj_name'] = new_name(kwargs_names['obj_name'])
     
     if mode == 'msh':
         if kwargs_names['priority_msh'] == 'new':
-            kwargs_names['msh_name'] = new_name(kwargs_names['msh_name'], [m.name for m in bpy.data.meshes])
+            kwargs_names['msh_name'] = new_name(kwargs_names['msh_name'], coll='meshes')
     if mode == 'gp':
         if kwargs_names['priority_gp'] == 'new':
-            kwargs_names['gp_name'] = new_name(kwargs_names['gp_name'], [g.name for g in bpy.data.grease_pencils])
+            kwargs_names['gp_name'] = new_name(kwargs_names['gp_name'], coll='grease_pencils')
     if mode == 'curve':
         if kwargs_names['priority_curve'] == 'new':
-            kwargs_names['curve_name'] = new_name(kwargs_names['curve_name'], [g.name for g in bpy.data.curves])
+            kwargs_names['curve_name'] = new_name(kwargs_names['curve_name'], coll='curves')
     return kwargs_names, kwargs_other
 
+@functools.lru_cache(maxsize=None)
 def bpy_type(type_name):
     """'Object' -> bpy.types.Object."""
     assert isinstance(type_name, str)
@@ -255,6 +337,7 @@ def bpy_type(type_name):
     type_name = exc.get(type_name, type_name)
     return getattr(bpy.types, type_name) # bpy.types.Object
 
+@functools.lru_cache(maxsize=None)
 def bpy_coll_name(this_type):
     """
     bpy.types.Object -> 'objects'
@@ -454,6 +537,7 @@ def clean_kwargs(kwargs, kwargs_def, kwargs_alias=None):
 
 def scale_data(d:np.ndarray, d_lim:tuple=None, clip:bool=True) -> np.ndarray: # scale the input between 0 and 1
     """Scale data in a numpy array such that the entries in d_lim scale to (0,1)"""
+    d = np.array(d, dtype=float) # copy, so clipping doesn't modify the input
     if d_lim is None:
         d_lim = (np.min(d), np.max(d))
     do = d_lim[0]
@@ -464,6 +548,49 @@ def scale_data(d:np.ndarray, d_lim:tuple=None, clip:bool=True) -> np.ndarray: #
     return (d - do)/dw
 
 
+def decimate(x, y, n_out, method='minmax'):
+    """
+    Indices of the samples to keep when drawing y(x) with about n_out points.
+    x should be sorted (e.g. time). The first and the last samples are always kept.
+    :param method:
+        'minmax' - minimum and maximum of y in each of n_out/2 equal-width x buckets
+        'lttb' - largest triangle three buckets (Steinarsson, 2013)
+    Returns sorted indices, or all indices if there are n_out samples or fewer.
+    """
+    assert method in ('minmax', 'lttb')
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    if method == 'minmax':
+        n_buckets = n_out//2
+        edges = np.linspace(x[0], x[-1], n_buckets+1)
+        bucket = np.clip(np.searchsorted(edges, x, side='right')-1, 0, n_buckets-1)
+        order = np.lexsort((y, bucket)) # by bucket, then by y
+        bucket_sorted = bucket[order]
+        first = np.flatnonzero(np.r_[True, bucket_sorted[1:] != bucket_sorted[:-1]])
+        last = np.r_[first[1:]-1, n-1]
+        return np.unique(np.r_[0, order[first], order[last], n-1])
+
+    # lttb - interior samples are split into n_out-2 buckets, and the
+    # sample making the largest triangle with the previously selected
+    # sample and the mean of the next bucket is kept from each bucket
+    edges = np.linspace(1, n-1, n_out-1).astype(int)
+    x_mean = np.r_[np.add.reduceat(x[:-1], edges[:-1])/np.diff(edges), x[-1]]
+    y_mean = np.r_[np.add.reduceat(y[:-1], edges[:-1])/np.diff(edges), y[-1]]
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n-1
+    a = 0
+    for i in range(n_out-2):
+        lo, hi = edges[i], edges[i+1]
+        area = np.abs((x[a] - x_mean[i+1])*(y[lo:hi] - y[a]) - (x[a] - x[lo:hi])*(y_mean[i+1] - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i+1] = a
+    return idx
+
+
 def reload(constraint='Workspace'):
     """
     Reloads all modules in sys with a specified constraint.
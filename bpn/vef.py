@@ -1,9 +1,23 @@
 """
 Collection of functions that output vertices, edges and faces.
+
+This module does not depend on blender, so that files can be parsed in worker processes.
 """
+import os
 
 import numpy as np
 
+# binary STL triangle record
+STL_DTYPE = np.dtype([('normal', '<f4', (3,)), ('v', '<f4', (3, 3)), ('attr', '<u2')])
+
+# PLY property types
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
 def ngon(n=3, r=1, th_off_deg='auto'):
     """
     n-sided polygon inscribed in a circle of radius r.
@@ -32,3 +46,197 @@ def xyz2vef(x, y, z):
     e = [(i, i+1) for i in np.arange(0, n-1)]
     f = []
     return v, e, f
+
+def grid2vef(x, y, z):
+    """
+    Convert a surface z sampled on the grid x (nX) by y (nY) into vertices and quad faces
+    :param z: (array) nX x nY
+    Returns v (nX*nY x 3, x changes fastest), f (nF x 4)
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    nX, nY = len(x), len(y)
+    z = np.asarray(z, dtype=float)
+    assert z.shape == (nX, nY)
+    v = np.empty((nY, nX, 3))
+    v[:, :, 0] = x[np.newaxis, :]
+    v[:, :, 1] = y[:, np.newaxis]
+    v[:, :, 2] = z.T
+    corner = np.arange(nX*nY).reshape(nY, nX)[:-1, :-1].reshape(-1)
+    f = np.stack((corner, corner+1, corner+nX+1, corner+nX), axis=1)
+    return v.reshape(-1, 3), f
+
+def write_stl(fname, v, f, header=''):
+    """
+    Write triangles to a binary STL file in one call.
+    :param fname: (str) full path of the file
+    :param v: (array) nV x 3 vertex coordinates
+    :param f: (array) nF x 3 vertex indices of triangles
+    :param header: (str) up to 80 characters written in the file header
+    """
+    f = np.asarray(f)
+    tri = np.zeros(len(f), dtype=STL_DTYPE)
+    tri['v'] = np.asarray(v, dtype='<f4')[f]
+    n = np.cross(tri['v'][:, 1] - tri['v'][:, 0], tri['v'][:, 2] - tri['v'][:, 0])
+    n_len = np.linalg.norm(n, axis=1, keepdims=True)
+    tri['normal'] = np.divide(n, n_len, out=np.zeros_like(n), where=n_len > 0)
+    with open(fname, 'wb') as fid:
+        fid.write(header.encode()[:80].ljust(80, b' '))
+        fid.write(np.array(len(tri), dtype='<u4').tobytes())
+        tri.tofile(fid)
+
+def read_mesh(fname):
+    """Read vertices and faces from an STL or PLY file. See read_stl and read_ply."""
+    ext = os.path.splitext(fname)[-1].lower()
+    if ext == '.stl':
+        return read_stl(fname)
+    if ext == '.ply':
+        return read_ply(fname)
+    raise ValueError('Unsupported file type: ' + fname)
+
+def read_stl(fname):
+    """
+    Read an STL file (binary or ASCII).
+    Files that start with 'solid' and have a 'facet' line are ASCII, others are binary.
+    Binary files are memory-mapped, and duplicate vertices are merged.
+    Returns (v, f) - vertices nVx3 (float32), and triangles nFx3 (int32)
+    """
+    with open(fname, 'rb') as fid:
+        head = fid.read(1024)
+    if head.lstrip().startswith(b'solid') and b'facet' in head: # binary headers can also start with 'solid'
+        with open(fname, 'r', errors='replace') as fid:
+            co = [line.split()[1:4] for line in fid if line.lstrip().startswith('vertex')]
+        return _merge_vertices(np.array(co, dtype=np.float32).reshape(-1, 3))
+
+    if len(head) < 84:
+        raise ValueError(fname + ' is too short to be a binary STL file')
+    n_tri = int(np.frombuffer(head[80:84], dtype='<u4')[0])
+    if 84 + n_tri*STL_DTYPE.itemsize > os.path.getsize(fname):
+        raise ValueError(fname + ' is truncated: the header lists {} triangles'.format(n_tri))
+    if n_tri == 0:
+        return np.empty((0, 3), dtype=np.float32), np.empty((0, 3), dtype=np.int32)
+    tri = np.memmap(fname, dtype=STL_DTYPE, mode='r', offset=84, shape=(n_tri,)) # trailing bytes are ignored
+    co = np.array(tri['v'], dtype=np.float32).reshape(-1, 3)
+    del tri # release the file
+    return _merge_vertices(co)
+
+def _merge_vertices(co):
+    """Merge duplicate vertices in a list of triangle corners (3*nF x 3)."""
+    v, inv = np.unique(co, axis=0, return_inverse=True)
+    return v, inv.reshape(-1, 3).astype(np.int32)
+
+def read_ply(fname):
+    """
+    Read a PLY file (ASCII or binary).
+    Returns (v, f) - vertices nVx3 (float32), and faces as an nFxk (int32) array
+    if all faces have k vertices, or a list of arrays otherwise.
+    """
+    elements = [] # (name, count, properties)
+    fmt = None
+    with open(fname, 'rb') as fid:
+        if fid.readline().strip() != b'ply':
+            raise ValueError(fname + ' is not a PLY file')
+        while True:
+            line = fid.readline()
+            if not line:
+                raise ValueError(fname + ' has an incomplete header')
+            words = line.decode('ascii', 'replace').split()
+            if not words:
+                continue
+            if words[0] == 'format':
+                fmt = words[1]
+            elif words[0] == 'element':
+                elements.append((words[1], int(words[2]), []))
+            elif words[0] == 'property':
+                elements[-1][2].append(words[1:])
+            elif words[0] == 'end_header':
+                break
+        offset = fid.tell()
+
+    if fmt is None:
+        raise ValueError(fname + ' is missing format line')
+    if fmt == 'ascii':
+        data = _read_ply_ascii(fname, offset, elements)
+    else:
+        data = _read_ply_binary(fname, offset, elements, '<' if fmt == 'binary_little_endian' else '>')
+
+    vert = data['vertex']
+    v = np.column_stack((vert['x'], vert['y'], vert['z'])).astype(np.float32)
+    f = data.get('face', {})
+    f = f.get('vertex_indices', f.get('vertex_index', []))
+    if isinstance(f, list) and f and all(len(x) == len(f[0]) for x in f):
+        f = np.array(f)
+    if isinstance(f, np.ndarray):
+        f = f.astype(np.int32).reshape(len(f), -1)
+    else:
+        f = [np.asarray(x, dtype=np.int32) for x in f]
+    return v, f
+
+def _read_ply_binary(fname, offset, elements, endian):
+    """Read the body of a binary PLY file into {element name: {property name: array or list}}."""
+    ret = {}
+    with open(fname, 'rb') as fid:
+        fid.seek(offset)
+        data = fid.read()
+    pos = 0
+    for name, count, props in elements:
+        if all(p[0] != 'list' for p in props): # fixed size records
+            dt = np.dtype([(p[1], endian+PLY_TYPES[p[0]]) for p in props])
+            arr = np.frombuffer(data, dtype=dt, count=count, offset=pos)
+            ret[name] = {p[1]: arr[p[1]] for p in props}
+            pos += count*dt.itemsize
+            continue
+        if len(props) == 1 and count > 0: # e.g. faces - fast path when all lists have the same length
+            _, cnt_type, item_type, prop_name = props[0]
+            cnt_dt = np.dtype(endian+PLY_TYPES[cnt_type])
+            k = int(np.frombuffer(data, dtype=cnt_dt, count=1, offset=pos)[0])
+            dt = np.dtype([('n', cnt_dt), ('idx', endian+PLY_TYPES[item_type], (k,))])
+            if pos + count*dt.itemsize <= len(data):
+                arr = np.frombuffer(data, dtype=dt, count=count, offset=pos)
+                if np.all(arr['n'] == k):
+                    ret[name] = {prop_name: arr['idx']}
+                    pos += count*dt.itemsize
+                    continue
+        ret[name] = {p[-1]: [] for p in props}
+        for _ in range(count):
+            for p in props:
+                if p[0] == 'list':
+                    cnt_dt = np.dtype(endian+PLY_TYPES[p[1]])
+                    item_dt = np.dtype(endian+PLY_TYPES[p[2]])
+                    n = int(np.frombuffer(data, dtype=cnt_dt, count=1, offset=pos)[0])
+                    pos += cnt_dt.itemsize
+                    ret[name][p[-1]].append(np.frombuffer(data, dtype=item_dt, count=n, offset=pos))
+                    pos += n*item_dt.itemsize
+                else:
+                    dt = np.dtype(endian+PLY_TYPES[p[0]])
+                    ret[name][p[-1]].append(np.frombuffer(data, dtype=dt, count=1, offset=pos)[0])
+                    pos += dt.itemsize
+    return ret
+
+def _read_ply_ascii(fname, offset, elements):
+    """Read the body of an ASCII PLY file into {element name: {property name: array or list}}."""
+    ret = {}
+    with open(fname, 'rb') as fid:
+        fid.seek(offset)
+        lines = [line for line in fid.read().decode('ascii', 'replace').splitlines() if line.strip()]
+    pos = 0
+    for name, count, props in elements:
+        rows = lines[pos:pos+count]
+        pos += count
+        if all(p[0] != 'list' for p in props):
+            arr = np.array([row.split() for row in rows], dtype=float).reshape(count, len(props))
+            ret[name] = {p[1]: arr[:, i] for i, p in enumerate(props)}
+            continue
+        ret[name] = {p[-1]: [] for p in props}
+        for row in rows:
+            words = row.split()
+            i = 0
+            for p in props:
+                if p[0] == 'list':
+                    n = int(words[i])
+                    ret[name][p[-1]].append(np.array(words[i+1:i+1+n], dtype=int))
+                    i += n+1
+                else:
+                    ret[name][p[-1]].append(float(words[i]))
+                    i += 1
+    return ret
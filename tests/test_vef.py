@@ -0,0 +1,127 @@
+"""
+Tests for bpn.vef readers and writers. These don't need blender.
+Run with: python -m pytest tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bpn import vef # pylint: disable=wrong-import-position
+
+# tetrahedron
+V = np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]], dtype=np.float32)
+F = np.array([[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]], dtype=np.int32)
+
+def _triangles(v, f):
+    """Set of triangles as tuples of vertex coordinates, independent of vertex order."""
+    return sorted(tuple(map(tuple, np.asarray(v)[tri])) for tri in f)
+
+def test_stl_binary_round_trip(tmp_path):
+    fname = str(tmp_path / 'tetra.stl')
+    vef.write_stl(fname, V, F, header='solid tetra') # binary headers can start with 'solid'
+    assert os.path.getsize(fname) == 84 + 50*len(F)
+    v, f = vef.read_stl(fname)
+    assert v.dtype == np.float32 and f.dtype == np.int32
+    assert len(v) == len(V)
+    assert _triangles(v, f) == _triangles(V, F)
+
+def test_stl_binary_with_trailing_bytes(tmp_path):
+    fname = str(tmp_path / 'padded.stl')
+    vef.write_stl(fname, V, F)
+    with open(fname, 'ab') as fid:
+        fid.write(b'\x00')
+    v, f = vef.read_stl(fname)
+    assert _triangles(v, f) == _triangles(V, F)
+
+def test_stl_binary_truncated(tmp_path):
+    fname = str(tmp_path / 'truncated.stl')
+    vef.write_stl(fname, V, F)
+    with open(fname, 'rb+') as fid:
+        fid.truncate(os.path.getsize(fname) - 1)
+    with pytest.raises(ValueError):
+        vef.read_stl(fname)
+
+def test_stl_ascii(tmp_path):
+    fname = str(tmp_path / 'ascii.stl')
+    with open(fname, 'w') as fid:
+        fid.write('solid tetra\n')
+        for tri in F:
+            fid.write('facet normal 0 0 0\nouter loop\n')
+            for i in tri:
+                fid.write('vertex {} {} {}\n'.format(*V[i]))
+            fid.write('endloop\nendfacet\n')
+        fid.write('endsolid tetra\n')
+    v, f = vef.read_stl(fname)
+    assert _triangles(v, f) == _triangles(V, F)
+
+def _ply_header(fmt, n_faces=len(F)):
+    return '\n'.join([
+        'ply', 'format {} 1.0'.format(fmt), 'element vertex {}'.format(len(V)),
+        'property float x', 'property float y', 'property float z',
+        'element face {}'.format(n_faces), 'property list uchar int vertex_indices', 'end_header', '']).encode('ascii')
+
+def test_ply_ascii(tmp_path):
+    fname = str(tmp_path / 'ascii.ply')
+    body = ''.join('{} {} {}\n'.format(*p) for p in V) + ''.join('3 {} {} {}\n'.format(*tri) for tri in F)
+    with open(fname, 'wb') as fid:
+        fid.write(_ply_header('ascii') + body.encode('ascii'))
+    v, f = vef.read_ply(fname)
+    np.testing.assert_array_equal(v, V)
+    np.testing.assert_array_equal(f, F)
+
+@pytest.mark.parametrize('fmt, endian', [('binary_little_endian', '<'), ('binary_big_endian', '>')])
+def test_ply_binary(tmp_path, fmt, endian):
+    fname = str(tmp_path / 'binary.ply')
+    faces = np.zeros(len(F), dtype=[('n', 'u1'), ('idx', endian+'i4', (3,))])
+    faces['n'] = 3
+    faces['idx'] = F
+    with open(fname, 'wb') as fid:
+        fid.write(_ply_header(fmt))
+        fid.write(V.astype(endian+'f4').tobytes())
+        fid.write(faces.tobytes())
+    v, f = vef.read_ply(fname)
+    np.testing.assert_array_equal(v, V)
+    np.testing.assert_array_equal(f, F)
+
+def test_ply_mixed_faces(tmp_path):
+    fname = str(tmp_path / 'mixed.ply')
+    body = ''.join('{} {} {}\n'.format(*p) for p in V) + '3 0 1 2\n4 0 1 3 2\n'
+    with open(fname, 'wb') as fid:
+        fid.write(_ply_header('ascii', n_faces=2) + body.encode('ascii'))
+    _, f = vef.read_ply(fname)
+    assert [list(x) for x in f] == [[0, 1, 2], [0, 1, 3, 2]]
+
+def test_ply_bad_headers(tmp_path):
+    not_ply = str(tmp_path / 'not.ply')
+    with open(not_ply, 'wb') as fid:
+        fid.write(b'solid\n')
+    no_format = str(tmp_path / 'no_format.ply')
+    with open(no_format, 'wb') as fid:
+        fid.write(b'ply\nelement vertex 0\nproperty float x\nend_header\n')
+    incomplete = str(tmp_path / 'incomplete.ply')
+    with open(incomplete, 'wb') as fid:
+        fid.write(b'ply\nformat ascii 1.0\nelement vertex 0\n')
+    for fname in (not_ply, no_format, incomplete):
+        with pytest.raises(ValueError):
+            vef.read_ply(fname)
+
+def test_read_mesh_dispatch(tmp_path):
+    fname = str(tmp_path / 'tetra.STL')
+    vef.write_stl(fname, V, F)
+    v, f = vef.read_mesh(fname)
+    assert _triangles(v, f) == _triangles(V, F)
+    with pytest.raises(ValueError):
+        vef.read_mesh(str(tmp_path / 'tetra.obj'))
+
+def test_grid2vef():
+    x, y = np.arange(3.), np.arange(2.)
+    z = np.arange(6.).reshape(3, 2)
+    v, f = vef.grid2vef(x, y, z)
+    assert v.shape == (6, 3) and f.shape == (2, 4)
+    np.testing.assert_array_equal(v[:3, 0], x) # x changes fastest
+    np.testing.assert_array_equal(v[::3, 1], y)
+    np.testing.assert_array_equal(v[:, 2], z.T.ravel())
+    np.testing.assert_array_equal(f, [[0, 1, 4, 3], [1, 2, 5, 4]])